@@ -0,0 +1,103 @@
+"""Recall and query latency of the persona IVF indexes against exact search
+
+Synthetic listings are drawn from a Gaussian mixture (Iggy features of nearby
+listings are correlated) with the dimensionality of each persona feature set. Per
+persona it builds an `IVFIndex`, then for random indexed listings compares
+`most_similar` with the exact `SimilarityIndex` over the same standardized
+vectors: recall@5 and p50/p99 single-query latency. It also times save/load and
+an incremental insertion of 1% new listings.
+
+    python -m benchmarks.bench_ann --listings 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from recommender import IVFIndex, SimilarityIndex
+
+# persona: number of selected features, as in iggy_enrich_demo.ipynb
+PERSONAS = {"couple": 9, "family": 13, "friends": 6}
+
+
+def listings(n, d, rng, n_clusters=200):
+    centers = rng.normal(scale=3, size=(n_clusters, d))
+    return centers[rng.integers(0, n_clusters, n)] + rng.normal(size=(n, d))
+
+
+def latencies(query, ids):
+    runs = []
+    for id in ids:
+        start = time.perf_counter()
+        result = query(id)
+        runs.append(time.perf_counter() - start)
+    return result, np.array(runs) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for persona, d in PERSONAS.items():
+        vectors = listings(args.listings, d, rng)
+        ids = np.arange(args.listings) * 10
+        start = time.perf_counter()
+        index = IVFIndex().fit(vectors, ids)
+        print(
+            f"{persona}: {args.listings} listings x {d} features,"
+            f" {index.n_lists} lists, built in {time.perf_counter() - start:.2f}s"
+        )
+        exact = SimilarityIndex(index.transform(vectors), ids)
+        queries = rng.choice(ids, args.queries, replace=False)
+        expected, runs = latencies(lambda id: exact.most_similar(id, args.k), queries)
+        print(
+            f"  exact        p50={np.percentile(runs, 50):7.2f}ms"
+            f"  p99={np.percentile(runs, 99):7.2f}ms"
+        )
+        truth = (
+            exact.most_similar_batch(queries, args.k)
+            .groupby("query_id")["id"]
+            .apply(set)
+        )
+        for n_probe in args.n_probe:
+            found = {}
+            __, runs = latencies(
+                lambda id: found.setdefault(
+                    id, index.most_similar(id, args.k, n_probe)
+                ),
+                queries,
+            )
+            recall = np.mean(
+                [len(truth[q] & set(found[q]["id"])) / args.k for q in queries]
+            )
+            print(
+                f"  n_probe={n_probe:<4d} p50={np.percentile(runs, 50):7.2f}ms"
+                f"  p99={np.percentile(runs, 99):7.2f}ms  recall@{args.k}={recall:.3f}"
+            )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, f"{persona}.npz")
+            start = time.perf_counter()
+            index.save(path)
+            saved = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = IVFIndex.load(path)
+            print(
+                f"  save {saved * 1e3:.1f}ms,"
+                f" load {(time.perf_counter() - start) * 1e3:.1f}ms"
+            )
+        n_new = args.listings // 100
+        start = time.perf_counter()
+        loaded.add(listings(n_new, d, rng), ids[-1] + 10 * np.arange(1, n_new + 1))
+        loaded.most_similar(ids[-1] + 10, args.k)
+        print(
+            f"  insert {n_new} listings + first query"
+            f" {(time.perf_counter() - start) * 1e3:.1f}ms"
+        )
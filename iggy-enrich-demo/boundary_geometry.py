@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+
+class BoundaryGeometries:
+    """Deduplicated WKT geometries of one boundary level, indexed by an integer
+    boundary id (0..n-1). The WKT is only parsed, once, when `geometry` is first
+    accessed; maps can use `frame` with the WKT as is."""
+
+    def __init__(self, wkt: pd.Series):
+        self.wkt = wkt.reset_index(drop=True)
+        self.wkt.index.name = "boundary_id"
+        self._geometry = None
+
+    def __len__(self) -> int:
+        return len(self.wkt)
+
+    @property
+    def geometry(self):
+        """Parsed geometries as a GeoSeries (WGS84) with the boundary ids as index,
+        parsed in one vectorized call"""
+        if self._geometry is None:
+            import geopandas as gpd
+
+            self._geometry = gpd.GeoSeries.from_wkt(self.wkt, crs="WGS84")
+        return self._geometry
+
+    def frame(
+        self, df: Optional[pd.DataFrame] = None, id_col: Optional[str] = None
+    ) -> pd.DataFrame:
+        """One row per boundary with its WKT, plus the first values of the other
+        columns of `df` for the rows referencing it through `id_col`"""
+        frame = self.wkt.to_frame()
+        if df is not None:
+            values = df[df[id_col] >= 0].groupby(id_col).first()
+            frame = frame.join(values, how="inner")
+        return frame
+
+
+def split_geometries(
+    df: pd.DataFrame, geometry_cols: List[str]
+) -> Tuple[pd.DataFrame, Dict[str, BoundaryGeometries]]:
+    """Replace each WKT column of `df` by an int32 `{col}_id` column referencing a
+    deduplicated `BoundaryGeometries` table (-1 where the geometry is missing)"""
+    split = df.drop(geometry_cols, axis=1)
+    tables = {}
+    for col in geometry_cols:
+        codes, uniques = pd.factorize(df[col])
+        split[f"{col}_id"] = codes.astype(np.int32)
+        tables[col] = BoundaryGeometries(pd.Series(uniques, name=col))
+    return split, tables
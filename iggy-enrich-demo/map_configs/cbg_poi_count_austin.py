@@ -81,7 +81,7 @@ config = {
                     "id": "pt8ub6k",
                     "type": "geojson",
                     "config": {
-                        "dataId": "poi_count_cbg",
+                        "dataId": "cbg_boundaries",
                         "label": "geometry",
                         "color": [18, 92, 119],
                         "highlightColor": [252, 242, 26, 255],
@@ -81,7 +81,7 @@ config = {
                     "id": "dynwt2e",
                     "type": "geojson",
                     "config": {
-                        "dataId": "poi_count_zipcode",
+                        "dataId": "zipcode_boundaries",
                         "label": "geometry",
                         "color": [30, 150, 190],
                         "highlightColor": [252, 242, 26, 255],
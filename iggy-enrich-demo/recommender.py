@@ -0,0 +1,321 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+Filters = Optional[Union[str, np.ndarray, pd.Series]]
+# similarity scores per batch of queries (float32, plus int64 partition indices)
+BATCH_SCORES = 2**24
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """float32 copy of `vectors` with unit L2 norm rows (all-zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class SimilarityIndex:
+    """Exact cosine similarity top-k search over listing feature vectors.
+
+    The vectors are normalized once, so a query is one matrix-vector product and a
+    partial sort, and memory stays O(N·d) rather than the O(N²) of a full similarity
+    matrix. `filters` restrict the candidates, either as a boolean mask over the
+    rows or as an expression evaluated on `attributes` (aligned with the rows),
+    e.g. "accommodates >= 4".
+    """
+
+    def __init__(
+        self, vectors, ids: Sequence, attributes: Optional[pd.DataFrame] = None
+    ):
+        self.vectors = normalize_rows(vectors)
+        self.ids = pd.Index(ids)
+        if not self.ids.is_unique:
+            raise ValueError("ids must be unique")
+        if attributes is not None:
+            attributes = attributes.reset_index(drop=True)
+        self.attributes = attributes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self, ids: Sequence) -> np.ndarray:
+        """Row positions of `ids`"""
+        positions = self.ids.get_indexer(ids)
+        if (positions < 0).any():
+            raise KeyError(f"Unknown ids: {list(np.asarray(ids)[positions < 0])}")
+        return positions
+
+    def mask(self, filters: Filters) -> Optional[np.ndarray]:
+        """Boolean mask of the rows passing `filters` (None if unfiltered)"""
+        if filters is None:
+            return None
+        if isinstance(filters, str):
+            filters = self.attributes.eval(filters)
+        return np.asarray(filters, dtype=bool)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        filters: Filters = None,
+        exclude: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and similarities of the `k` rows most similar to each
+        normalized query vector, best first. Rows filtered out, or the row in
+        `exclude` for each query, are skipped; results are padded with -1 / nan
+        when fewer than `k` rows qualify"""
+        scores = np.atleast_2d(queries) @ self.vectors.T
+        mask = self.mask(filters)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        if exclude is not None:
+            scores[np.arange(len(scores)), exclude] = -np.inf
+        k = min(k, scores.shape[1])
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        missing = np.isneginf(top_scores)
+        top[missing] = -1
+        top_scores[missing] = np.nan
+        return top, top_scores
+
+    def similarities(self, id) -> np.ndarray:
+        """Cosine similarity of every row to listing `id`"""
+        return self.vectors @ self.vectors[self.positions([id])[0]]
+
+    def most_similar(self, id, k: int = 5, filters: Filters = None) -> pd.DataFrame:
+        """The `k` listings most similar to listing `id` (excluding itself), best
+        first, with their `id` and `similarity`"""
+        similar = self.most_similar_batch([id], k, filters)
+        return similar.drop(["query_id", "rank"], axis=1).reset_index(drop=True)
+
+    def most_similar_batch(
+        self,
+        ids: Sequence,
+        k: int = 5,
+        filters: Filters = None,
+        batch_size: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """`most_similar` for many listings, as rows of `query_id`, `rank`, `id` and
+        `similarity`. Queries are scored `batch_size` at a time (by default as many
+        as fit `BATCH_SCORES` scores), bounding the memory to `batch_size` x N"""
+        batch_size = batch_size or max(1, BATCH_SCORES // len(self))
+        positions = self.positions(ids)
+        mask = self.mask(filters)
+        results = []
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start : start + batch_size]
+            top, scores = self.search(self.vectors[batch], k, mask, exclude=batch)
+            found = top >= 0
+            results.append(
+                pd.DataFrame(
+                    {
+                        "query_id": self.ids[np.repeat(batch, found.sum(axis=1))],
+                        "rank": np.nonzero(found)[1],
+                        "id": self.ids[top[found]],
+                        "similarity": scores[found],
+                    }
+                )
+            )
+        return pd.concat(results, ignore_index=True)
+
+
+class IVFIndex:
+    """Approximate cosine similarity top-k search with an inverted file index.
+
+    Standardized, normalized vectors are grouped into `n_lists` lists by their most
+    similar k-means centroid, stored contiguously per list. A query only scores the
+    vectors of the `n_probe` lists whose centroids are most similar to it, trading
+    recall for a scan of roughly `n_probe / n_lists` of the index. Vectors are
+    passed unscaled; the standardization learned by `fit` applies to later `add`
+    calls and queries, and is saved with the index.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.ids = np.empty(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._positions: Optional[pd.Index] = None
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self.ids)
+
+    def transform(self, vectors) -> np.ndarray:
+        """Standardized, normalized float32 copy of `vectors`"""
+        return normalize_rows(
+            (np.asarray(vectors, dtype=np.float32) - self.mean) / self.scale
+        )
+
+    def fit(self, vectors, ids: Sequence, max_train: int = 64) -> "IVFIndex":
+        """Learn the standardization and `n_lists` centroids (default sqrt(N))
+        from at most `max_train` vectors per list, then index `vectors`"""
+        from sklearn.cluster import KMeans
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.mean = vectors.mean(axis=0)
+        std = vectors.std(axis=0)
+        self.scale = np.where(std > 0, std, 1).astype(np.float32)
+        normalized = self.transform(vectors)
+        if self.n_lists is None:
+            self.n_lists = max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(self.seed)
+        n_train = min(len(vectors), self.n_lists * max_train)
+        train = normalized[rng.choice(len(vectors), n_train, replace=False)]
+        kmeans = KMeans(self.n_lists, n_init=1, random_state=self.seed).fit(train)
+        self.centroids = normalize_rows(kmeans.cluster_centers_)
+        self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.asarray(ids).dtype)
+        self.offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        self._pending = []
+        self._add_normalized(normalized, ids)
+        return self
+
+    def add(self, vectors, ids: Sequence) -> None:
+        """Insert listings into their nearest lists, replacing those whose id is
+        already indexed. They are merged into the contiguous lists on the next query
+        or `save`"""
+        self._add_normalized(self.transform(vectors), ids)
+
+    def _add_normalized(self, normalized: np.ndarray, ids: Sequence) -> None:
+        ids = np.asarray(ids)
+        if not pd.Index(ids).is_unique:
+            raise ValueError("ids must be unique")
+        lists = np.argmax(normalized @ self.centroids.T, axis=1)
+        self._pending.append((normalized, ids, lists))
+        self._positions = None
+
+    def _merge(self) -> None:
+        """Merge pending insertions into the per list layout"""
+        if not self._pending:
+            return
+        lists = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        vectors = np.concatenate([self.vectors] + [v for v, __, __ in self._pending])
+        ids = np.concatenate([self.ids] + [i for __, i, __ in self._pending])
+        lists = np.concatenate([lists] + [l for __, __, l in self._pending])
+        # a re-added id keeps only its latest vector
+        latest = ~pd.Index(ids).duplicated(keep="last")
+        vectors, ids, lists = vectors[latest], ids[latest], lists[latest]
+        order = np.argsort(lists, kind="stable")
+        self.vectors, self.ids = vectors[order], ids[order]
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(lists, minlength=self.n_lists))]
+        )
+        self._pending = []
+
+    def search(
+        self, queries: np.ndarray, k: int = 5, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions (in `ids`) and similarities of the approximate `k` nearest
+        listings to each transformed query vector, best first; padded with -1 / nan
+        when the probed lists hold fewer than `k` listings"""
+        self._merge()
+        queries = np.atleast_2d(queries)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probed = np.argpartition(queries @ self.centroids.T, -n_probe, axis=1)
+        top = np.full((len(queries), k), -1, dtype=np.int64)
+        top_scores = np.full((len(queries), k), np.nan, dtype=np.float32)
+        for i, (query, lists) in enumerate(zip(queries, probed[:, -n_probe:])):
+            candidates = np.concatenate(
+                [np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists]
+            )
+            scores = self.vectors[candidates] @ query
+            n = min(k, len(scores))
+            if n == 0:
+                continue
+            best = np.argpartition(scores, -n)[-n:]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            top[i, :n] = candidates[best]
+            top_scores[i, :n] = scores[best]
+        return top, top_scores
+
+    def most_similar_batch(
+        self, ids: Sequence, k: int = 5, n_probe: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Approximate `SimilarityIndex.most_similar_batch` for indexed listings"""
+        self._merge()
+        if self._positions is None:
+            self._positions = pd.Index(self.ids)
+        positions = self._positions.get_indexer(ids)
+        if (positions < 0).any():
+            raise KeyError(f"Unknown ids: {list(np.asarray(ids)[positions < 0])}")
+        # the listing itself is normally its own nearest neighbour
+        top, scores = self.search(self.vectors[positions], k + 1, n_probe)
+        found = (top >= 0) & (top != positions[:, None])
+        found &= np.cumsum(found, axis=1) <= k
+        return pd.DataFrame(
+            {
+                "query_id": np.repeat(self.ids[positions], found.sum(axis=1)),
+                "rank": np.cumsum(found, axis=1)[found] - 1,
+                "id": self.ids[top[found]],
+                "similarity": scores[found],
+            }
+        )
+
+    def most_similar(
+        self, id, k: int = 5, n_probe: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Approximate `SimilarityIndex.most_similar`"""
+        similar = self.most_similar_batch([id], k, n_probe)
+        return similar.drop(["query_id", "rank"], axis=1).reset_index(drop=True)
+
+    def save(self, path: str) -> None:
+        """Write the index to a `.npz` file, atomically"""
+        self._merge()
+        ids = self.ids.astype(str) if self.ids.dtype == object else self.ids
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                mean=self.mean,
+                scale=self.scale,
+                centroids=self.centroids,
+                vectors=self.vectors,
+                ids=ids,
+                offsets=self.offsets,
+                params=np.array([self.n_probe, self.seed]),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            n_probe, seed = data["params"]
+            index = cls(len(data["centroids"]), int(n_probe), int(seed))
+            for name in ["mean", "scale", "centroids", "vectors", "ids", "offsets"]:
+                setattr(index, name, data[name])
+        return index
+
+
+def build_persona_indexes(
+    df: pd.DataFrame,
+    personas: Dict[str, List[str]],
+    id_col: str = "id",
+    filters: Dict[str, str] = {},
+    **kwargs,
+) -> Dict[str, IVFIndex]:
+    """One `IVFIndex` per persona over the rows of `df` with all of its features,
+    e.g. `{"couple": couple_selected_features, ...}`. A persona's `filters`
+    expression, evaluated on `df` (e.g. "accommodates >= 4"), restricts its rows
+    to the listings it can book"""
+    indexes = {}
+    for persona, features in personas.items():
+        persona_df = df
+        if persona in filters:
+            persona_df = persona_df[persona_df.eval(filters[persona])]
+        persona_df = persona_df[features + [id_col]].dropna()
+        indexes[persona] = IVFIndex(**kwargs).fit(
+            persona_df[features], persona_df[id_col]
+        )
+        print(f"Indexed {len(persona_df)} listings for persona {persona}")
+    return indexes
@@ -0,0 +1,48 @@
+"""Compare dense and `CompactFrame` splits of the benchmark data
+
+Loads the dataset both ways (through the columnar cache) and reports load time,
+in-memory size of the feature splits and the size of the pickled, gzip-compressed
+splits, as Metaflow stores them as artifacts. Checks that the compact splits expand
+back to the dense ones.
+
+    python -m benchmarks.bench_compact_dataset
+"""
+import gzip
+import pickle
+
+import pandas as pd
+
+from benchmarks.common import benchmark_parser, report, timed
+from utils import load_dataset
+
+if __name__ == "__main__":
+    args = benchmark_parser(__doc__).parse_args()
+
+    timings, sizes = {}, {}
+    for compact in (False, True):
+        label = "compact" if compact else "dense"
+        for __ in range(args.repeat):
+            with timed(f"load_dataset ({label})", timings):
+                data, scaler = load_dataset(
+                    args.benchmark_data_path,
+                    "log_price_per_sqft",
+                    "split",
+                    columnar_cache=True,
+                    compact=compact,
+                )
+        X_splits = data[::2]
+        if compact:
+            memory = sum(X.nbytes for X in X_splits)
+            for X, expected in zip(X_splits, dense_splits):
+                pd.testing.assert_frame_equal(X.to_frame(), expected, check_dtype=False)
+        else:
+            memory = sum(X.memory_usage(deep=True).sum() for X in X_splits)
+            dense_splits = X_splits
+        pickled = gzip.compress(pickle.dumps(data), compresslevel=3)
+        sizes[label] = (memory, len(pickled))
+    report(timings)
+    for label, (memory, pickled) in sizes.items():
+        print(
+            f"{label:<8} splits in memory={memory / 2**20:6.2f}MiB"
+            f"  pickled+gzip={pickled / 2**20:6.2f}MiB"
+        )
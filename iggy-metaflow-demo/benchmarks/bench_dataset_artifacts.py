@@ -0,0 +1,107 @@
+"""Compare pickled LoadedDataset artifacts with content-addressed Arrow splits
+
+Replays the `self.dataset` artifacts of IggyEnrichFlow's steps, twice (two runs):
+`start` loads the benchmark data, `enrich` adds 16 synthetic Iggy columns (the
+Iggy package is not needed) and `feature_selection` keeps 50 columns. Each
+artifact is serialized the way Metaflow stores it, pickled and gzip-compressed,
+once as the former `(data, scaler)` namedtuple and as `LoadedDataset`, whose
+splits go to a temporary `DatasetStore` uncompressed (the default) or with zstd.
+Reported per step: save and load time (load includes reading every split) and the
+bytes added to the datastore.
+
+    python -m benchmarks.bench_dataset_artifacts
+"""
+import gzip
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import benchmark_parser
+from dataset_store import LoadedDataset
+from utils import CompactFrame, load_dataset, select_columns
+
+N_IGGY_FEATURES = 16
+MODEL_DIM = 50
+
+
+def enrich(X, rng):
+    iggy = pd.DataFrame(
+        rng.normal(size=(len(X), N_IGGY_FEATURES)).astype(np.float32),
+        index=X.index,
+        columns=[f"iggy_feature_{i}" for i in range(N_IGGY_FEATURES)],
+    )
+    if isinstance(X, CompactFrame):
+        return X.with_dense(pd.concat([X.dense, iggy], axis=1))
+    return pd.concat([X, iggy], axis=1)
+
+
+def flow_artifacts(args):
+    """`self.dataset` data after each step of IggyEnrichFlow"""
+    data, scaler = load_dataset(
+        args.benchmark_data_path,
+        "log_price_per_sqft",
+        "split",
+        columnar_cache=True,
+        compact=True,
+    )
+    yield "start", data, scaler
+    rng = np.random.default_rng(0)
+    X_train, y_train, X_val, y_val, X_test, y_test = data
+    X_train, X_val, X_test = (enrich(X, rng) for X in (X_train, X_val, X_test))
+    yield "enrich", (X_train, y_train, X_val, y_val, X_test, y_test), scaler
+    selected = list(X_train.columns[-MODEL_DIM:])
+    X_train, X_val, X_test = (
+        select_columns(X, selected) for X in (X_train, X_val, X_test)
+    )
+    yield "feature_selection", (X_train, y_train, X_val, y_val, X_test, y_test), scaler
+
+
+def store_bytes(store_loc):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, __, names in os.walk(store_loc)
+        for name in names
+    )
+
+
+def touch(data):
+    for split in data:
+        frame = split.dense if isinstance(split, CompactFrame) else pd.DataFrame(split)
+        frame.select_dtypes("number").sum()
+
+
+if __name__ == "__main__":
+    args = benchmark_parser(__doc__).parse_args()
+
+    with tempfile.TemporaryDirectory() as store_loc:
+        for run in (1, 2):
+            print(f"run {run}")
+            for step, data, scaler in flow_artifacts(args):
+                results = {}
+                for label, artifact in [
+                    ("pickle", (data, scaler)),
+                    ("arrow", LoadedDataset(data, scaler, store_loc)),
+                    ("zstd", LoadedDataset(data, scaler, store_loc, "zstd")),
+                ]:
+                    before = store_bytes(store_loc)
+                    start = time.perf_counter()
+                    blob = gzip.compress(
+                        pickle.dumps(artifact, protocol=4), compresslevel=3
+                    )
+                    saved = time.perf_counter() - start
+                    start = time.perf_counter()
+                    loaded = pickle.loads(gzip.decompress(blob))
+                    touch(loaded[0])
+                    loaded_time = time.perf_counter() - start
+                    stored = len(blob) + store_bytes(store_loc) - before
+                    results[label] = (saved, loaded_time, stored)
+                for label, (saved, loaded_time, stored) in results.items():
+                    print(
+                        f"  {step:<18} {label:<7} save={saved * 1e3:7.1f}ms"
+                        f"  load={loaded_time * 1e3:7.1f}ms"
+                        f"  stored={stored / 2**20:6.2f}MiB"
+                    )
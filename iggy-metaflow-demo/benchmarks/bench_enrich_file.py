@@ -0,0 +1,76 @@
+"""Stream a points file through `enrich_file` and check the Parquet output
+
+Writes synthetic points (1M by default) as CSV and Parquet with two columns whose
+per-chunk types change the way state-wide files do: `note` is empty in the first
+chunk and holds strings later, and `lot_size` holds integers that get decimals
+later. Both files are enriched against the synthetic package of
+`bench_quadkey_index` in chunks, and the output is checked against the input and
+a single `enrich_df` call over all points.
+
+    python -m benchmarks.bench_enrich_file
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_quadkey_index import SyntheticPackage, random_points
+from benchmarks.common import benchmark_parser, report, timed
+from enrichment import QuadkeyIndex, enrich_file
+
+
+def synthetic_points(n, chunk_size, rng):
+    lat, lon = random_points(n, rng)
+    rows = np.arange(n)
+    return pd.DataFrame(
+        {
+            "latitude": lat,
+            "longitude": lon,
+            "note": np.where(rows < chunk_size, None, "corner lot"),
+            "lot_size": np.where(rows < chunk_size, rows, rows + 0.5),
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.add_argument("--quadkeys", type=int, default=200_000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.set_defaults(repeat=1)
+    args = parser.parse_args()
+
+    index = QuadkeyIndex(SyntheticPackage(args.quadkeys))
+    index.load()
+    points = synthetic_points(args.points, args.chunk_size, np.random.default_rng(1))
+    expected = index.enrich_df(points)
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        inputs = {
+            "csv": os.path.join(tmp_dir, "points.csv"),
+            "parquet": os.path.join(tmp_dir, "points.parquet"),
+        }
+        points.to_csv(inputs["csv"], index=False)
+        points.to_parquet(inputs["parquet"], index=False)
+        output_path = os.path.join(tmp_dir, "enriched.parquet")
+        for fmt, input_path in inputs.items():
+            for __ in range(args.repeat):
+                with timed(f"enrich_file ({fmt})", timings):
+                    enrich_file(
+                        index, input_path, output_path, chunk_size=args.chunk_size
+                    )
+            enriched = pd.read_parquet(output_path)
+            pd.testing.assert_frame_equal(
+                enriched.drop(["note", "lot_size"], axis=1),
+                expected.drop(["note", "lot_size"], axis=1),
+                check_dtype=False,
+            )
+            assert enriched["note"].isna().sum() == args.chunk_size
+            assert (enriched["note"].iloc[args.chunk_size :] == "corner lot").all()
+            np.testing.assert_array_equal(enriched["lot_size"], points["lot_size"])
+    report(timings)
+    for label, runs in timings.items():
+        print(f"{label}: {args.points / min(runs) / 1e3:6.0f}K rows/s")
+    print("enriched files match the input and enrich_df")
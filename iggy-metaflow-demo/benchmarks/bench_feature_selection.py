@@ -0,0 +1,63 @@
+"""Memory of the feature-selection transform on the Pinellas splits
+
+Compares the previous `SelectKBest.transform` + `pd.DataFrame` rebuild with
+`select_columns`, including the array handed to the model on `fit`.
+
+    python -m benchmarks.bench_feature_selection
+"""
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.utils.validation import check_array
+
+from benchmarks.common import benchmark_parser, report, timed
+from utils import load_dataset, mutual_info_scores, select_columns
+
+
+def peak_mib(fn):
+    tracemalloc.start()
+    result = fn()
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20
+
+
+def legacy_transform(dfs, feature_names):
+    # SelectKBest.transform + DataFrame rebuild, then the estimator's input check
+    frames = [
+        pd.DataFrame(df[feature_names].to_numpy(), columns=feature_names) for df in dfs
+    ]
+    return [check_array(df, dtype=np.float32) for df in frames]
+
+
+def view_transform(dfs, feature_names):
+    frames = [select_columns(df, feature_names) for df in dfs]
+    return [check_array(df, dtype=np.float32) for df in frames]
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.add_argument("--model-dim", type=int, default=50)
+    parser.add_argument("--no-columnar-cache", action="store_true")
+    args = parser.parse_args()
+    (X_train, y_train, X_val, __, X_test, __), __ = load_dataset(
+        args.benchmark_data_path,
+        "log_price_per_sqft",
+        "split",
+        columnar_cache=not args.no_columnar_cache,
+    )
+    dfs = [X_train, X_val, X_test]
+    scores = mutual_info_scores(X_train, y_train)
+    feature_names = scores.nlargest(args.model_dim).index.to_numpy(dtype=object)
+
+    timings = {}
+    for label, transform in (
+        ("legacy transform", legacy_transform),
+        ("select_columns", view_transform),
+    ):
+        for __ in range(args.repeat):
+            with timed(label, timings):
+                arrays, peak = peak_mib(lambda: transform(dfs, feature_names))
+        print(f"{label:<40} peak={peak:7.1f}MiB  model input dtype={arrays[0].dtype}")
+    report(timings)
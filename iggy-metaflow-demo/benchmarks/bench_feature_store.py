@@ -0,0 +1,112 @@
+"""Compare loading an Iggy package from parquet with the memory-mapped feature store
+
+A synthetic package with the Pinellas boundaries, ~230 features and WKT geometry is
+written to a temporary directory. Each case runs in a freshly spawned process and
+reports its wall time and RSS growth: whole-table parquet reads (what
+`LocalIggyDataPackage.load` does), then `MappedIggyDataPackage.read_boundary` for
+the 16 features the flows use and for every feature.
+
+    python -m benchmarks.bench_feature_store
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import benchmark_parser
+from feature_store import MappedIggyDataPackage
+
+VERSION_ID = "20211110214810"
+PREFIX = "fl_pinellas_quadkeys"
+# boundary: (rows, features, WKT vertices per geometry)
+BOUNDARIES = {
+    "qk_isochrone_walk_10m": (250_000, 40, 12),
+    "cbg": (700, 100, 200),
+    "census_tract": (250, 30, 300),
+    "county": (1, 15, 2000),
+    "locality": (30, 15, 500),
+    "metro": (1, 15, 2000),
+    "zipcode": (50, 15, 400),
+}
+# as in IGGY_FEATURES: 10 walk isochrone and 6 cbg features
+SELECTED = {"qk_isochrone_walk_10m": 10, "cbg": 6}
+
+
+def write_package(base_loc):
+    rng = np.random.default_rng(0)
+    package = MappedIggyDataPackage(VERSION_ID, PREFIX, base_loc, PREFIX)
+    os.makedirs(package.data_loc)
+    for bnd, (rows, n_features, vertices) in BOUNDARIES.items():
+        df = pd.DataFrame(
+            rng.normal(size=(rows, n_features)),
+            columns=[f"feature_{i}" for i in range(n_features)],
+        )
+        df["id"] = np.arange(rows).astype(str)
+        ring = ", ".join(["-82.712345 27.912345"] * vertices)
+        df["geometry"] = [f"POLYGON (({ring}))"] * rows
+        df.to_parquet(os.path.join(package.data_loc, f"{PREFIX}_{bnd}_{VERSION_ID}"))
+    return package
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def load_case(package, case):
+    before, start = rss_bytes(), time.perf_counter()
+    if case == "parquet, all columns":
+        tables = [
+            pd.read_parquet(
+                os.path.join(package.data_loc, f"{PREFIX}_{bnd}_{VERSION_ID}")
+            )
+            for bnd in BOUNDARIES
+        ]
+    elif case == "feature store, 16 features":
+        tables = [
+            package.read_boundary(bnd, [f"feature_{i}_{bnd}" for i in range(n)])
+            for bnd, n in SELECTED.items()
+        ]
+    else:
+        tables = [package.read_boundary(bnd) for bnd in BOUNDARIES]
+    # touch every value, as enrichment would
+    n_columns = sum(t.shape[1] for t in tables)
+    for t in tables:
+        t.select_dtypes("number").sum()
+    return time.perf_counter() - start, rss_bytes() - before, n_columns
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_loc:
+        package = write_package(base_loc)
+        package.store_loc = os.path.join(base_loc, "store")
+        os.makedirs(package.store_loc)
+        start = time.perf_counter()
+        for bnd in BOUNDARIES:
+            package.boundary_path(bnd)
+        print(f"one-off conversion: {time.perf_counter() - start:.2f}s")
+
+        cases = [
+            "parquet, all columns",
+            "feature store, 16 features",
+            "feature store, all features",
+        ]
+        spawn = multiprocessing.get_context("spawn")
+        for case in cases:
+            runs = []
+            for __ in range(args.repeat):
+                with ProcessPoolExecutor(1, mp_context=spawn) as pool:
+                    runs.append(pool.submit(load_case, package, case).result())
+            elapsed, rss, n_columns = min(runs)
+            print(
+                f"{case:<30} columns={n_columns:4d}  best={elapsed * 1e3:8.2f}ms"
+                f"  rss=+{rss / 2**20:7.1f}MiB"
+            )
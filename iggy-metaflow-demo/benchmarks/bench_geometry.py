@@ -0,0 +1,82 @@
+"""Compare per-row WKT parsing of boundary geometries with vectorized parsing and
+the WKB cache of `MappedIggyDataPackage.read_geometry`
+
+Synthetic Pinellas cbg and walk isochrone boundaries are written as a package in a
+temporary directory. Per boundary, it times the notebooks' former
+`geometry.map(wkt.loads)`, one `GeoSeries.from_wkt` call, and `read_geometry`
+from a fresh package object once the WKB cache exists.
+
+    python -m benchmarks.bench_geometry
+"""
+import os
+import tempfile
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely import wkt
+
+from benchmarks.common import benchmark_parser, report, timed
+from feature_store import MappedIggyDataPackage
+
+VERSION_ID = "20211110214810"
+PREFIX = "fl_pinellas_quadkeys"
+# boundary: (rows, WKT vertices per geometry)
+BOUNDARIES = {"cbg": (700, 200), "qk_isochrone_walk_10m": (20_000, 60)}
+
+
+def random_polygons(rows, vertices, rng):
+    """WKT star-shaped polygons around random Pinellas points"""
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    polygons = []
+    for lat, lon in zip(
+        rng.uniform(27.6, 28.2, rows), rng.uniform(-82.85, -82.6, rows)
+    ):
+        radius = rng.uniform(0.002, 0.01, vertices)
+        ring = [
+            f"{x:.6f} {y:.6f}"
+            for x, y in zip(
+                lon + radius * np.cos(angles), lat + radius * np.sin(angles)
+            )
+        ]
+        polygons.append(f"POLYGON (({', '.join(ring + ring[:1])}))")
+    return polygons
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    timings = {}
+    with tempfile.TemporaryDirectory() as base_loc:
+        package = MappedIggyDataPackage(VERSION_ID, PREFIX, base_loc, PREFIX)
+        os.makedirs(package.data_loc)
+        store_loc = os.path.join(base_loc, "store")
+        for bnd, (rows, vertices) in BOUNDARIES.items():
+            df = pd.DataFrame({"id": np.arange(rows).astype(str)})
+            df["geometry"] = random_polygons(rows, vertices, rng)
+            df.to_parquet(
+                os.path.join(package.data_loc, f"{PREFIX}_{bnd}_{VERSION_ID}")
+            )
+
+        for bnd in BOUNDARIES:
+            package = MappedIggyDataPackage(
+                VERSION_ID, PREFIX, base_loc, PREFIX, store_loc
+            )
+            geometry = package.read_boundary(bnd, geometry=True)[f"geometry_{bnd}"]
+            with timed(f"{bnd}: read_geometry, WKB cache miss", timings):
+                cached = package.read_geometry(bnd)
+            for __ in range(args.repeat):
+                with timed(f"{bnd}: map(wkt.loads)", timings):
+                    expected = gpd.GeoSeries(geometry.map(wkt.loads), crs="WGS84")
+                with timed(f"{bnd}: GeoSeries.from_wkt", timings):
+                    gpd.GeoSeries.from_wkt(geometry, crs="WGS84")
+                package = MappedIggyDataPackage(
+                    VERSION_ID, PREFIX, base_loc, PREFIX, store_loc
+                )
+                with timed(f"{bnd}: read_geometry, WKB cache hit", timings):
+                    cached = package.read_geometry(bnd)
+            assert cached.geom_equals_exact(expected.set_axis(cached.index), 1e-9).all()
+    report(timings)
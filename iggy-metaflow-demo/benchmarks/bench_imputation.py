@@ -0,0 +1,80 @@
+"""Compare KNNImputer with MissingValueImputer on the Pinellas data
+
+Iggy-like location features (smooth functions of latitude/longitude) are added to
+the benchmark frame and blanked out on a share of rows, the way points outside a
+covered boundary come back from enrichment. As in `IggyFlow.iggy_enrich`, the base
+features are scaled and MissingValueImputer runs while the location columns are
+still there (its knn mode uses them as neighbour columns); KNNImputer gets the
+frame without them, as the flows used to.
+
+    python -m benchmarks.bench_imputation
+"""
+import numpy as np
+import pandas as pd
+from sklearn.impute import KNNImputer
+
+from benchmarks.common import benchmark_parser, report, timed
+from utils import ContinuousScaler, MissingValueImputer
+
+
+def add_location_features(df, missing_rate, n_features=16, seed=123):
+    coefs = np.random.default_rng(0).normal(size=(n_features, 3))
+    rng = np.random.default_rng(seed)
+    lat = (df["latitude"] - df["latitude"].mean()) / df["latitude"].std()
+    lon = (df["longitude"] - df["longitude"].mean()) / df["longitude"].std()
+    truth = {}
+    for i, (a, b, c) in enumerate(coefs):
+        truth[f"iggy_feature_{i}"] = np.sin(a * lat) + np.cos(b * lon) + c * lat * lon
+    truth = pd.DataFrame(truth, index=df.index)
+    # boundaries: two groups of columns that go missing together
+    enriched = df.join(truth)
+    half = n_features // 2
+    for cols in (truth.columns[:half], truth.columns[half:]):
+        enriched.loc[rng.random(len(df)) < missing_rate, cols] = np.nan
+    return enriched, truth
+
+
+def rmse(imputed, truth, mask):
+    return np.sqrt(
+        np.mean((imputed[truth.columns].to_numpy()[mask] - truth.to_numpy()[mask]) ** 2)
+    )
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.add_argument("--missing-rate", type=float, default=0.1)
+    parser.set_defaults(repeat=1)
+    args = parser.parse_args()
+    df = pd.read_csv(args.benchmark_data_path)
+    train = df.loc[df["split"] == "TRAIN"].drop(["split", "strap"], axis=1)
+    val = df.loc[df["split"] == "VALIDATE"].drop(["split", "strap"], axis=1)
+    train, train_truth = add_location_features(train, args.missing_rate)
+    val, val_truth = add_location_features(val, args.missing_rate, seed=321)
+    location_cols = ["latitude", "longitude"]
+    scaler = ContinuousScaler(ignore_cols=list(train_truth.columns) + location_cols)
+    scaler.fit(train)
+    train_geo, val_geo = scaler.transform(train), scaler.transform(val)
+    train = train_geo.drop(location_cols, axis=1)
+    val = val_geo.drop(location_cols, axis=1)
+    val_mask = val[val_truth.columns].isna().to_numpy()
+
+    timings, errors = {}, {}
+    for __ in range(args.repeat):
+        with timed("KNNImputer (train + val)", timings):
+            legacy_train = pd.DataFrame(
+                KNNImputer(n_neighbors=3).fit_transform(train), columns=train.columns
+            )
+            legacy_val = pd.DataFrame(
+                KNNImputer(n_neighbors=3).fit_transform(val), columns=val.columns
+            )
+        errors["KNNImputer (train + val)"] = rmse(legacy_val, val_truth, val_mask)
+        for method in ("knn", "median", "geo"):
+            label = f"MissingValueImputer {method} (train + val)"
+            with timed(label, timings):
+                imputer = MissingValueImputer(method, location_cols=location_cols)
+                imputer.fit_transform(train_geo.copy())
+                imputed_val = imputer.transform(val_geo.copy())
+            errors[label] = rmse(imputed_val, val_truth, val_mask)
+    report(timings)
+    for label, error in errors.items():
+        print(f"{label:<40} val rmse={error:.4f}")
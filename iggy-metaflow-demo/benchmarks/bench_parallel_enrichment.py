@@ -0,0 +1,53 @@
+"""Scaling of QuadkeyIndex enrichment with the number of worker processes
+
+Enriches synthetic points (5M by default) against the synthetic package of
+`bench_quadkey_index`, serially and with process pools of increasing size, and
+checks every parallel result against the serial one. The pool is started by a
+warm-up call, so timings cover partitioning, the workers' lookups and gathering.
+
+    python -m benchmarks.bench_parallel_enrichment --workers 1 2 4 8 16
+"""
+import os
+
+import numpy as np
+
+from benchmarks.bench_quadkey_index import SyntheticPackage, random_points
+from benchmarks.common import benchmark_parser, report, timed
+from enrichment import QuadkeyIndex
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.add_argument("--quadkeys", type=int, default=200_000)
+    parser.add_argument("--points", type=int, default=5_000_000)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="pool sizes"
+    )
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs available")
+
+    index = QuadkeyIndex(SyntheticPackage(args.quadkeys))
+    index.load()
+    lat, lon = random_points(args.points, np.random.default_rng(1))
+    timings = {}
+    for n_workers in args.workers:
+        index.n_workers = n_workers
+        if n_workers > 1:
+            # warm-up: start the pool and share the index
+            index.enrich(lat, lon)
+        for __ in range(args.repeat):
+            with timed(f"{n_workers:3d} worker(s)", timings):
+                values = index.enrich(lat, lon)
+        if n_workers == args.workers[0]:
+            reference = values
+        for bnd in reference:
+            np.testing.assert_array_equal(values[bnd], reference[bnd])
+        index.close()
+    report(timings)
+
+    base = min(next(iter(timings.values())))
+    for label, runs in timings.items():
+        print(
+            f"{label}: {args.points / min(runs) / 1e6:6.2f}M points/s"
+            f"  speedup x{base / min(runs):.2f}"
+        )
@@ -0,0 +1,104 @@
+"""Compare the iggyenrich merge chain with QuadkeyIndex lookups
+
+A synthetic package covering Pinellas county is built from level 19 quadkeys of
+random points, with a cbg, a zipcode and a walk isochrone boundary. The merge
+chain mirrors `LocalIggyDataPackage.enrich`: a per-row `pyquadkey2` call, a join
+on the crosswalk and one merge per boundary. It runs on a subset of the points
+since its cost is linear in them.
+
+    python -m benchmarks.bench_quadkey_index
+"""
+import numpy as np
+import pandas as pd
+from pyquadkey2 import quadkey
+
+from benchmarks.common import benchmark_parser, report, timed
+from enrichment import QuadkeyIndex
+
+BOUNDS = {"cbg": 8000, "zipcode": 60, "qk_isochrone_walk_10m": 200000}
+N_FEATURES = 6
+
+
+class SyntheticPackage:
+    """The parts of a loaded `LocalIggyDataPackage` that enrichment reads"""
+
+    def __init__(self, n_quadkeys, seed=0):
+        rng = np.random.default_rng(seed)
+        lat, lon = random_points(n_quadkeys, rng)
+        ids = [str(quadkey.from_geo((a, b), 19)) for a, b in zip(lat, lon)]
+        self.crosswalk_data = pd.DataFrame(
+            {f"{bnd}_id": rng.integers(0, n, n_quadkeys) for bnd, n in BOUNDS.items()},
+            index=pd.Index(ids, name="id"),
+        )
+        self.crosswalk_data = self.crosswalk_data[
+            ~self.crosswalk_data.index.duplicated()
+        ]
+        self.boundary_data = {}
+        for bnd, n in BOUNDS.items():
+            df = pd.DataFrame(rng.normal(size=(n, N_FEATURES)))
+            df.columns = [f"feature_{i}_{bnd}" for i in range(N_FEATURES)]
+            df[f"id_{bnd}"] = np.arange(n)
+            self.boundary_data[bnd] = df
+        self.bounds_features = {bnd: [] for bnd in BOUNDS}
+
+    def load(self, boundaries=[], features=[]):
+        pass
+
+
+def random_points(n, rng):
+    return rng.uniform(27.6, 28.2, n), rng.uniform(-82.85, -82.6, n)
+
+
+def merge_chain(package, points):
+    points = points.copy()
+    points.index.name = "points_index"
+    points["qk"] = points.apply(
+        lambda row: str(
+            quadkey.from_geo((row["latitude"], row["longitude"]), level=19)
+        ),
+        axis=1,
+    )
+    joined = points.join(package.crosswalk_data, how="left", on="qk").reset_index()
+    for bnd in package.bounds_features:
+        joined = joined.merge(
+            package.boundary_data[bnd],
+            how="left",
+            left_on=f"{bnd}_id",
+            right_on=f"id_{bnd}",
+        ).drop([f"id_{bnd}"], axis=1)
+    joined.set_index("points_index", inplace=True)
+    return joined.drop(["qk"] + list(package.crosswalk_data.columns), axis=1)
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser(__doc__)
+    parser.add_argument("--quadkeys", type=int, default=200_000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--baseline-points", type=int, default=50_000)
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    package = SyntheticPackage(args.quadkeys)
+    # with fewer quadkeys than level 19 tiles in the box, some points go unmatched
+    lat, lon = random_points(args.points, np.random.default_rng(1))
+    points = pd.DataFrame({"latitude": lat, "longitude": lon})
+    subset = points.iloc[: args.baseline_points]
+
+    timings = {}
+    index = QuadkeyIndex(package)
+    with timed("QuadkeyIndex.load", timings):
+        index.load()
+    for __ in range(args.repeat):
+        with timed(f"merge chain ({len(subset)} points)", timings):
+            expected = merge_chain(package, subset)
+        with timed(f"QuadkeyIndex.enrich_df ({len(subset)} points)", timings):
+            index.enrich_df(subset)
+        with timed(f"QuadkeyIndex.enrich_df ({len(points)} points)", timings):
+            enriched = index.enrich_df(points)
+    report(timings)
+
+    pd.testing.assert_frame_equal(
+        enriched.iloc[: len(subset)], expected[enriched.columns], check_names=False
+    )
+    matched = enriched.iloc[:, 2].notna().mean()
+    print(f"results match the merge chain; {matched:.1%} of points matched a quadkey")
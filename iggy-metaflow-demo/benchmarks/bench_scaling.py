@@ -0,0 +1,49 @@
+"""Compare the per-column scaling loop with ContinuousScaler on the Pinellas data
+
+    python -m benchmarks.bench_scaling
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import benchmark_parser, report, timed
+from utils import ContinuousScaler
+
+
+def legacy_scale_continuous_values(
+    df, n_sample=2000, ignore_cols=[], scaled_features=None
+):
+    """Per-column implementation that ContinuousScaler replaced"""
+    scaled_features = {} if scaled_features is None else scaled_features
+    continuous_cols = df.columns[~df.head(n_sample).isin([0, 1]).all()]
+    for col in continuous_cols:
+        if col == "geometry" or col in ignore_cols:
+            continue
+        mean, std = scaled_features.get(col, [df[col].mean(), df[col].std()])
+        scaled_features[col] = [mean, std]
+        df.loc[:, col] = (df[col] - mean) / std
+    return df, scaled_features
+
+
+if __name__ == "__main__":
+    args = benchmark_parser(__doc__).parse_args()
+    df = pd.read_csv(args.benchmark_data_path).drop(["split", "strap"], axis=1)
+    ignore_cols = ["longitude", "latitude"]
+
+    timings = {}
+    for __ in range(args.repeat):
+        legacy_df = df.copy()
+        with timed("legacy per-column loop", timings):
+            legacy_df, scaled_features = legacy_scale_continuous_values(
+                legacy_df, ignore_cols=ignore_cols
+            )
+        scaled_df = df.copy()
+        with timed("ContinuousScaler.fit_transform", timings):
+            scaler = ContinuousScaler(ignore_cols=ignore_cols)
+            scaled_df = scaler.fit_transform(scaled_df)
+    report(timings)
+
+    assert sorted(scaled_features) == sorted(scaler.columns)
+    for col, (mean, std) in scaled_features.items():
+        assert np.allclose(scaler[col], (mean, std), rtol=1e-12)
+    assert np.allclose(legacy_df.to_numpy(), scaled_df.to_numpy(), rtol=1e-12)
+    print(f"Identical results over {len(scaler.columns)} continuous columns")
@@ -0,0 +1,31 @@
+import argparse
+import time
+from contextlib import contextmanager
+
+BENCHMARK_DATA_LOCATION = "./data/benchmark/iggy_re_salesprice_pinellas_20211203.csv"
+
+
+def benchmark_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--benchmark-data-path",
+        default=BENCHMARK_DATA_LOCATION,
+        help="Path to benchmark dataset",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of timed repetitions"
+    )
+    return parser
+
+
+@contextmanager
+def timed(label: str, timings: dict):
+    """Record wall time of the enclosed block under `label`"""
+    start = time.perf_counter()
+    yield
+    timings.setdefault(label, []).append(time.perf_counter() - start)
+
+
+def report(timings: dict) -> None:
+    for label, runs in timings.items():
+        print(f"{label:<40} best={min(runs) * 1e3:9.2f}ms  runs={len(runs)}")
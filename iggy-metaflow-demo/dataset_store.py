@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from typing import List, Optional, Tuple
+from file_utils import atomic_path, evict_lru
+
+DATASET_STORE_LOCATION = "./dataset_store"
+
+# store directory under the Metaflow datastore root
+DATASET_STORE_PREFIX = "iggy_dataset_store"
+
+KIND_KEY = b"iggy_dataset_kind"
+
+
+def _to_table(split):
+    """Arrow table of a DataFrame, Series or CompactFrame, with what is needed to
+    rebuild it in the schema metadata"""
+    import pyarrow as pa
+    from utils import CompactFrame
+
+    if isinstance(split, CompactFrame):
+        codes = pd.DataFrame(
+            {prefix: group.codes for prefix, group in split.groups.items()},
+            index=split.index,
+        )
+        df = pd.concat([split.dense, codes], axis=1)
+        kind = {
+            "kind": "compact",
+            "groups": {
+                prefix: list(group.columns) for prefix, group in split.groups.items()
+            },
+            "columns": list(split.columns),
+        }
+    elif isinstance(split, pd.Series):
+        df, kind = split.to_frame(name="values"), {"kind": "series", "name": split.name}
+    else:
+        df, kind = split, {"kind": "frame"}
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[KIND_KEY] = json.dumps(kind).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def default_store_root() -> str:
+    """`iggy_dataset_store` under the Metaflow datastore root (S3 when it is the
+    default datastore), or an absolute `./dataset_store` without a configured root"""
+    try:
+        from metaflow.metaflow_config import (
+            DATASTORE_SYSROOT_LOCAL,
+            DATASTORE_SYSROOT_S3,
+            DEFAULT_DATASTORE,
+        )
+    except ImportError:
+        return os.path.abspath(DATASET_STORE_LOCATION)
+    if DEFAULT_DATASTORE == "s3" and DATASTORE_SYSROOT_S3:
+        return f"{DATASTORE_SYSROOT_S3.rstrip('/')}/{DATASET_STORE_PREFIX}"
+    if DATASTORE_SYSROOT_LOCAL:
+        root = os.path.abspath(DATASTORE_SYSROOT_LOCAL)
+        return os.path.join(root, DATASET_STORE_PREFIX)
+    return os.path.abspath(DATASET_STORE_LOCATION)
+
+
+def _from_table(table):
+    """Inverse of `_to_table`"""
+    from utils import CompactFrame, OneHotGroup
+
+    kind = json.loads(table.schema.metadata[KIND_KEY])
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if kind["kind"] == "series":
+        return df["values"].rename(kind["name"])
+    if kind["kind"] == "compact":
+        groups = {
+            prefix: OneHotGroup(columns, df.pop(prefix).to_numpy())
+            for prefix, columns in kind["groups"].items()
+        }
+        return CompactFrame(df, groups, kind["columns"])
+    return df
+
+
+class DatasetStore:
+    """Content-addressed store of dataset splits as Arrow IPC files.
+
+    A split is named by the SHA-256 of its serialized table, so storing a split that
+    an earlier step or run already stored writes nothing. `store_loc` is a local
+    directory or an `s3://` prefix written through Metaflow's S3 client (default:
+    `default_store_root()`). Local files are memory-mapped on read, leaving columns
+    without nulls backed by the shared file pages; with `compression` ("lz4" or
+    "zstd") files are smaller but decompressed into fresh memory.
+
+    Local files are touched when used, and the least recently used ones are evicted
+    once the directory exceeds `max_bytes`; an S3 prefix is left to a bucket
+    lifecycle rule.
+    """
+
+    def __init__(
+        self,
+        store_loc: Optional[str] = None,
+        compression: Optional[str] = None,
+        max_bytes: int = 10 * 1024**3,
+    ):
+        self.store_loc = store_loc or default_store_root()
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.is_s3 = self.store_loc.startswith("s3://")
+        self.bytes_written = 0
+        self.bytes_reused = 0
+
+    def name(self, key: str) -> str:
+        return f"{key[:2]}/{key}.arrow"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.store_loc, key[:2], f"{key}.arrow")
+
+    def exists(self, key: str) -> bool:
+        if self.is_s3:
+            from metaflow import S3
+
+            with S3(s3root=self.store_loc) as s3:
+                return s3.info(self.name(key), return_missing=True).exists
+        return os.path.exists(self.path(key))
+
+    def put(self, split) -> str:
+        """Store `split` unless already present and return its key"""
+        import pyarrow as pa
+
+        table = _to_table(split)
+        sink = pa.BufferOutputStream()
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        buffer = sink.getvalue()
+        key = hashlib.sha256(memoryview(buffer)).hexdigest()
+        if self.exists(key):
+            self.touch(key)
+            self.bytes_reused += buffer.size
+            return key
+        if self.is_s3:
+            from metaflow import S3
+
+            with S3(s3root=self.store_loc) as s3:
+                s3.put(self.name(key), buffer.to_pybytes())
+        else:
+            path = self.path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_path(path) as tmp_path:
+                with pa.OSFile(tmp_path, "wb") as f:
+                    f.write(buffer)
+        self.bytes_written += buffer.size
+        return key
+
+    def get(self, key: str):
+        import pyarrow as pa
+
+        if self.is_s3:
+            from metaflow import S3
+
+            with S3(s3root=self.store_loc) as s3:
+                blob = s3.get(self.name(key)).blob
+            return _from_table(pa.ipc.open_file(pa.py_buffer(blob)).read_all())
+        path = self.path(key)
+        self.touch(key)
+        with pa.memory_map(path) as source:
+            return _from_table(pa.ipc.open_file(source).read_all())
+
+    def touch(self, key: str) -> None:
+        """Mark a local split as recently used"""
+        if self.is_s3:
+            return
+        try:
+            os.utime(self.path(key))
+        except OSError:  # read-only store
+            pass
+
+    def evict(self, keep: List[str] = []) -> None:
+        """Delete least recently used local splits, except `keep`, until under
+        `max_bytes`. Artifacts of older runs may still refer to them: reading those
+        raises `FileNotFoundError`, and `LoadedDataset.available` is false"""
+        if not self.is_s3:
+            keep_paths = [self.path(key) for key in keep]
+            evict_lru(self.store_loc, self.max_bytes, ".arrow", keep_paths)
+
+
+class LoadedDataset:
+    """The six splits (X_train, y_train, X_val, y_val, X_test, y_test) and the
+    scaler passed between flow steps, indexable like the `(data, scaler)` tuple.
+
+    Pickled as a Metaflow artifact, it only carries the scaler and the keys of
+    its splits in a `DatasetStore` (by default under the Metaflow datastore root,
+    so other hosts and `--with batch` tasks can read it): splits unchanged from an
+    earlier step or run are not written again, and a step reading the artifact
+    loads the splits on first access of `data`. If the store cannot be written, the
+    splits are pickled inline instead.
+    """
+
+    def __init__(
+        self,
+        data,
+        scaler,
+        store_loc: Optional[str] = None,
+        compression: Optional[str] = None,
+    ):
+        self._data: Optional[Tuple] = tuple(data)
+        self._keys: List[str] = []
+        self.scaler = scaler
+        self.store_loc = store_loc
+        self.compression = compression
+
+    @property
+    def data(self) -> Tuple:
+        if self._data is None:
+            store = DatasetStore(self.store_loc)
+            try:
+                self._data = tuple(store.get(key) for key in self._keys)
+            except FileNotFoundError as e:
+                raise FileNotFoundError(
+                    f"Splits missing from the dataset store {store.store_loc} (evicted"
+                    " or deleted); re-run the step that produced this dataset"
+                ) from e
+        return self._data
+
+    def available(self) -> bool:
+        """Whether every split can be read (always true before pickling)"""
+        if self._data is not None:
+            return True
+        store = DatasetStore(self.store_loc)
+        return all(store.exists(key) for key in self._keys)
+
+    def stored_keys(self) -> Optional[List[str]]:
+        """Keys of the splits in the store, or None once the splits were loaded (they
+        may have been modified in place since) or if they were never stored"""
+        return self._keys if self._data is None else None
+
+    def __getitem__(self, i: int):
+        return (self.data, self.scaler)[i]
+
+    def __iter__(self):
+        return iter((self.data, self.scaler))
+
+    def __len__(self) -> int:
+        return 2
+
+    def __getstate__(self):
+        store = DatasetStore(self.store_loc, self.compression)
+        state = {
+            "scaler": self.scaler,
+            "store_loc": store.store_loc,
+            "compression": self.compression,
+        }
+        if self.stored_keys() is not None:
+            state["keys"] = self._keys
+            return state
+        # splits may have been modified in place since they were loaded, so they
+        # are hashed again
+        try:
+            state["keys"] = [store.put(split) for split in self.data]
+            store.evict(keep=state["keys"])
+        except Exception as e:  # OSError locally, Metaflow S3 errors on S3
+            print(
+                f"Dataset store {store.store_loc} unavailable ({e}),"
+                " pickling the splits instead"
+            )
+            state["data"] = self.data
+            return state
+        print(
+            f"Dataset splits: {store.bytes_written / 2**20:.1f}MiB written,"
+            f" {store.bytes_reused / 2**20:.1f}MiB already stored"
+        )
+        return state
+
+    def __setstate__(self, state):
+        self._data = state.get("data")
+        self._keys = state.get("keys", [])
+        self.scaler = state["scaler"]
+        self.store_loc = state["store_loc"]
+        self.compression = state["compression"]
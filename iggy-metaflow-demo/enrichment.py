@@ -0,0 +1,697 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import weakref
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+from file_utils import atomic_path, evict_lru
+
+
+def unique_locations(
+    df: pd.DataFrame, latitude_col: str = "latitude", longitude_col: str = "longitude"
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Return the distinct (latitude, longitude) pairs of `df` and, for every row, the
+    position of its pair among them"""
+    # one complex key per pair factorizes an order of magnitude faster than a
+    # MultiIndex of the two columns
+    lat = df[latitude_col].to_numpy(dtype=np.float64)
+    lon = df[longitude_col].to_numpy(dtype=np.float64)
+    codes, uniques = pd.factorize(lat + 1j * lon)
+    # rows missing a coordinate (code -1) share one trailing NaN location; done by
+    # hand since `use_na_sentinel` needs pandas >= 1.5
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = len(uniques)
+        uniques = np.append(uniques, complex(np.nan, np.nan))
+    return (
+        pd.DataFrame({latitude_col: uniques.real, longitude_col: uniques.imag}),
+        codes,
+    )
+
+
+# Web Mercator latitude bounds used by Bing / pyquadkey2 tiles
+MAX_LATITUDE = 85.05112878
+# invalid points get a key above any level <= 31 quadkey, so they never match
+NO_QUADKEY = np.uint64(np.iinfo(np.uint64).max)
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 32 bits of `v` (uint64)"""
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def quadkey_ints(latitude, longitude, level: int = 19) -> np.ndarray:
+    """Quadkeys of the given points as base-4 integers (uint64), matching
+    `int(str(quadkey.from_geo((lat, lon), level)), 4)` without a per-point loop.
+    Points with missing coordinates get `NO_QUADKEY`."""
+    lat = np.asarray(latitude, dtype=np.float64)
+    lon = np.asarray(longitude, dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    lat = np.clip(np.where(valid, lat, 0.0), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.clip(np.where(valid, lon, 0.0), -180.0, 180.0)
+    map_size = 256 * 2**level
+    sin_lat = np.sin(np.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    pixel_x = np.clip(x * map_size + 0.5, 0, map_size - 1).astype(np.uint64)
+    pixel_y = np.clip(y * map_size + 0.5, 0, map_size - 1).astype(np.uint64)
+    tile_x, tile_y = pixel_x >> np.uint64(8), pixel_y >> np.uint64(8)
+    qk = (_spread_bits(tile_y) << np.uint64(1)) | _spread_bits(tile_x)
+    qk[~valid] = NO_QUADKEY
+    return qk
+
+
+def parse_quadkeys(quadkeys) -> np.ndarray:
+    """Quadkey strings of equal level (e.g. the crosswalk "id" column) as base-4
+    integers (uint64)"""
+    raw = np.asarray(quadkeys, dtype=bytes)
+    level = raw.dtype.itemsize
+    if (np.char.str_len(raw) != level).any():
+        raise ValueError("Quadkeys must all have the same level")
+    digits = raw.view(np.uint8).reshape(-1, level).astype(np.uint64) - np.uint64(48)
+    powers = np.uint64(4) ** np.arange(level - 1, -1, -1, dtype=np.uint64)
+    return digits @ powers
+
+
+# partitions for parallel enrichment are cut at level 14 (~2km tile) quadkey prefixes
+PARTITION_LEVEL = 14
+PARALLEL_MIN_POINTS = 50_000
+
+
+def _lookup(keys: np.ndarray, qk: np.ndarray) -> np.ndarray:
+    """Position of each quadkey in the sorted `keys`, or `len(keys)` (the trailing
+    NaN offset) when it is not there"""
+    if len(keys) == 0:
+        return np.zeros(len(qk), dtype=np.int64)
+    pos = np.searchsorted(keys, qk)
+    pos[pos == len(keys)] = 0
+    pos[keys[pos] != qk] = len(keys)
+    return pos
+
+
+def _to_shared(
+    arrays: Dict[str, np.ndarray], copy: Optional[List[str]] = None
+) -> Dict[str, np.memmap]:
+    """Back each array by a file in shared memory (/dev/shm where available),
+    copying in the contents of those named in `copy` (all by default)"""
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    shared = {}
+    for name, array in arrays.items():
+        fd, path = tempfile.mkstemp(prefix="iggy-enrich-", dir=shm_dir)
+        os.close(fd)
+        shared[name] = np.memmap(path, array.dtype, "w+", shape=array.shape)
+        if copy is None or name in copy:
+            shared[name][...] = array
+    return shared
+
+
+def _specs(shared: Dict[str, np.memmap]) -> Dict[str, tuple]:
+    return {name: (m.filename, m.shape, m.dtype.str) for name, m in shared.items()}
+
+
+def _attach(specs: Dict[str, tuple]) -> Dict[str, np.memmap]:
+    return {
+        name: np.memmap(path, np.dtype(dtype), "r+", shape=shape)
+        for name, (path, shape, dtype) in specs.items()
+    }
+
+
+def _release(pool, shared: Dict[str, np.memmap]) -> None:
+    """Shut down `pool` and unlink the `shared` files; their pages are freed once
+    no array maps them any more"""
+    if pool is not None:
+        pool.shutdown()
+    for m in shared.values():
+        os.remove(m.filename)
+
+
+# per worker process: the shared index arrays
+_worker_index: Dict[str, np.ndarray] = {}
+
+
+def _init_enrich_worker(index_specs: Dict[str, tuple]) -> None:
+    _worker_index.update(_attach(index_specs))
+
+
+def _quadkey_slice(
+    specs: Dict[str, tuple], start: int, end: int, level: int, cuts: np.ndarray
+) -> np.ndarray:
+    """Compute the quadkeys of points [start, end) and write their row numbers to
+    `rows[start:end]` grouped by partition (the quadkey ranges between `cuts`).
+    Returns the number of points of each partition"""
+    shared = _attach(specs)
+    qk = quadkey_ints(
+        shared["latitude"][start:end], shared["longitude"][start:end], level
+    )
+    shared["qk"][start:end] = qk
+    part = np.searchsorted(cuts, qk, side="right").astype(np.uint16)
+    # stable sort of small ints is a radix sort, linear in the slice
+    shared["rows"][start:end] = start + np.argsort(part, kind="stable")
+    return np.bincount(part, minlength=len(cuts) + 1)
+
+
+def _enrich_partition(
+    specs: Dict[str, tuple], lo: int, hi: Optional[int], ranges: List[Tuple[int, int]]
+) -> None:
+    """Look up the points whose quadkey is in [lo, hi) (hi=None: unbounded), whose
+    row numbers are in the `ranges` of the shared `rows`, and write their position
+    in the index keys to `pos`"""
+    shared = _attach(specs)
+    rows = np.concatenate(
+        [shared["rows"][a:b] for a, b in ranges] or [np.empty(0, dtype=np.int64)]
+    )
+    qk = shared["qk"][rows]
+    keys = _worker_index["keys"]
+    # the partition is a quadkey range, so only a slice of keys is searched
+    first = np.searchsorted(keys, np.uint64(lo))
+    last = len(keys) if hi is None else np.searchsorted(keys, np.uint64(hi))
+    pos = _lookup(keys[first:last], qk) + first
+    pos[pos == last] = len(keys)
+    shared["pos"][rows] = pos
+
+
+def _gather_slice(specs: Dict[str, tuple], start: int, end: int) -> None:
+    """Write the features of points [start, end) from their `pos`"""
+    shared = _attach(specs)
+    pos = shared["pos"][start:end]
+    for name, out in shared.items():
+        if name.startswith("out/"):
+            bnd = name[len("out/") :]
+            offsets = _worker_index[f"offsets/{bnd}"][pos]
+            out[:, start:end] = np.take(_worker_index[f"matrix/{bnd}"], offsets, axis=1)
+
+
+class QuadkeyIndex:
+    """Drop-in for `IggyEnrich` that enriches points with array lookups.
+
+    `load` reads the package as usual and then flattens its crosswalk into a sorted
+    array of quadkey integers with, per boundary, the row offset of each quadkey in
+    that boundary's feature matrix (the last row is all NaN for unmatched points).
+    Enriching a batch is then `quadkey_ints` + one `np.searchsorted` + a take per
+    boundary. Duplicate crosswalk quadkeys keep their first boundary row. `level` is
+    taken from the crosswalk quadkeys unless given, in which case it must match them.
+
+    With `n_workers > 1`, large batches are split into quadkey prefix partitions
+    and enriched by a process pool that reads the index from shared memory (see
+    `enrich_parallel`); `close` releases both.
+    """
+
+    def __init__(self, iggy_package, level: Optional[int] = None, n_workers: int = 1):
+        self.iggy_package = iggy_package
+        self.level = level
+        self.n_workers = n_workers
+        self._pool = None
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.offsets: Dict[str, np.ndarray] = {}
+        self.matrices: Dict[str, np.ndarray] = {}
+        self.columns: Dict[str, List[str]] = {}
+        self.loaded: Optional[Tuple[List[str], List[str]]] = None
+
+    def load(self, boundaries: List[str] = [], features: List[str] = []) -> None:
+        """Load the package and build the index, unless already loaded with the same
+        boundaries and features (e.g. once per chunk when streaming)"""
+        if self.loaded == (list(boundaries), list(features)):
+            return
+        self.iggy_package.load(boundaries, features)
+        crosswalk = self.iggy_package.crosswalk_data
+        ids = crosswalk.index.to_numpy()
+        level = len(str(ids[0])) if len(ids) else self.level
+        if self.level is not None and level != self.level:
+            raise ValueError(
+                f"The crosswalk has level {level} quadkeys, expected level {self.level}"
+            )
+        self.level = level
+        keys = parse_quadkeys(ids)
+        order = np.argsort(keys, kind="stable")
+        self.keys, first = np.unique(keys[order], return_index=True)
+        rows = order[first]
+
+        self.offsets, self.matrices, self.columns = {}, {}, {}
+        for bnd, bnd_features in self.iggy_package.bounds_features.items():
+            df_bnd = self.iggy_package.boundary_data[bnd]
+            extra = [f"{col}_{bnd}" for col in ("id", "name", "geometry")]
+            columns = [c for c in df_bnd.columns if c not in extra or c in bnd_features]
+            boundary_rows = pd.Index(df_bnd[f"id_{bnd}"]).get_indexer(
+                crosswalk[f"{bnd}_id"].to_numpy()[rows]
+            )
+            # unmatched quadkeys (-1) point at the trailing NaN row
+            boundary_rows[boundary_rows < 0] = df_bnd.shape[0]
+            table = df_bnd[columns]
+            for c in columns:
+                if "intersects" in c:
+                    table = table.assign(**{c: table[c].astype(float)})
+            numeric = all(pd.api.types.is_numeric_dtype(t) for t in table.dtypes)
+            matrix = table.to_numpy(dtype=np.float64 if numeric else object)
+            nan_row = np.full((1, len(columns)), np.nan, dtype=matrix.dtype)
+            self.offsets[bnd] = np.append(boundary_rows, df_bnd.shape[0])
+            # feature-major, so gathered rows come out in pandas' column layout
+            self.matrices[bnd] = np.ascontiguousarray(np.vstack([matrix, nan_row]).T)
+            self.columns[bnd] = columns
+        self.loaded = (list(boundaries), list(features))
+        self.close()
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The index as flat named arrays, as shared with enrichment workers"""
+        arrays = {"keys": self.keys}
+        for bnd in self.matrices:
+            arrays[f"offsets/{bnd}"] = self.offsets[bnd]
+            arrays[f"matrix/{bnd}"] = self.matrices[bnd]
+        return arrays
+
+    def enrich(self, latitude, longitude) -> Dict[str, np.ndarray]:
+        """Feature matrix rows of every boundary for each point"""
+        if self.n_workers > 1 and len(latitude) >= PARALLEL_MIN_POINTS * self.n_workers:
+            return self.enrich_parallel(latitude, longitude)
+        pos = _lookup(self.keys, quadkey_ints(latitude, longitude, self.level))
+        return {
+            bnd: np.take(matrix, self.offsets[bnd][pos], axis=1).T
+            for bnd, matrix in self.matrices.items()
+        }
+
+    def enrich_parallel(self, latitude, longitude) -> Dict[str, np.ndarray]:
+        """Enrich points in a process pool.
+
+        The quadkey space is cut at level `PARTITION_LEVEL` prefixes into
+        `2 * n_workers` ranges, balanced on a sample of the points. Workers then
+        compute quadkeys for contiguous slices of the points and group each slice's
+        row numbers by range, so each range's task reads only its own points and
+        searches a compact slice of the crosswalk, without a global sort. It writes
+        one index position per point; the features are then gathered by contiguous
+        slices of points, rather than scattered by every range over all outputs.
+        The index, points and outputs live in shared memory: tasks only carry their
+        bounds.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        if any(m.dtype != np.float64 for m in self.matrices.values()):
+            raise ValueError("Parallel enrichment needs numeric features only")
+        if self._pool is None:
+            index = _to_shared(self.arrays())
+            pool = ProcessPoolExecutor(
+                self.n_workers,
+                initializer=_init_enrich_worker,
+                initargs=(_specs(index),),
+            )
+            # released by `close`, or when the index is garbage collected
+            self._pool = (pool, weakref.finalize(self, _release, pool, index))
+        pool = self._pool[0]
+
+        n = len(latitude)
+        # zero-stride placeholders: only the shape and dtype of these are used
+        outputs = {
+            f"out/{bnd}": np.broadcast_to(np.nan, (m.shape[0], n))
+            for bnd, m in self.matrices.items()
+        }
+        shared = _to_shared(
+            {
+                "latitude": np.asarray(latitude, dtype=np.float64),
+                "longitude": np.asarray(longitude, dtype=np.float64),
+                "qk": np.broadcast_to(np.uint64(0), (n,)),
+                "rows": np.broadcast_to(np.int64(0), (n,)),
+                "pos": np.broadcast_to(np.int64(0), (n,)),
+                **outputs,
+            },
+            copy=["latitude", "longitude"],
+        )
+        try:
+            specs = _specs(shared)
+            n_parts = 2 * self.n_workers
+            step = max(1, n // 100_000)
+            sample = np.sort(
+                quadkey_ints(
+                    shared["latitude"][::step], shared["longitude"][::step], self.level
+                )
+            )
+            quantiles = sample[np.arange(1, n_parts) * len(sample) // n_parts]
+            shift = np.uint64(2 * (self.level - PARTITION_LEVEL))
+            cuts = np.unique((quantiles >> shift) << shift)
+
+            bounds = np.linspace(0, n, self.n_workers + 1).astype(np.int64)
+            tasks = [
+                pool.submit(_quadkey_slice, specs, start, end, self.level, cuts)
+                for start, end in zip(bounds[:-1], bounds[1:])
+            ]
+            # counts[s, p]: points of slice s in partition p, stored in that order
+            counts = np.array([task.result() for task in tasks])
+            starts = bounds[:-1, None] + np.cumsum(counts, axis=1) - counts
+            cuts = [int(c) for c in cuts]
+            tasks = [
+                pool.submit(
+                    _enrich_partition,
+                    specs,
+                    lo,
+                    hi,
+                    [(a, a + c) for a, c in zip(starts[:, p], counts[:, p]) if c],
+                )
+                for p, (lo, hi) in enumerate(zip([0] + cuts, cuts + [None]))
+            ]
+            for task in tasks:
+                task.result()
+            tasks = [
+                pool.submit(_gather_slice, specs, start, end)
+                for start, end in zip(bounds[:-1], bounds[1:])
+            ]
+            for task in tasks:
+                task.result()
+            return {bnd: shared[f"out/{bnd}"].T for bnd in self.matrices}
+        finally:
+            _release(None, shared)
+
+    def close(self) -> None:
+        """Shut down the worker pool and free the shared index"""
+        if self._pool is not None:
+            self._pool[1]()
+            self._pool = None
+
+    def enrich_df(
+        self,
+        df: pd.DataFrame,
+        latitude_col: str = "latitude",
+        longitude_col: str = "longitude",
+    ) -> pd.DataFrame:
+        """`df` with the loaded Iggy columns appended, same index and row order"""
+        values = self.enrich(df[latitude_col].to_numpy(), df[longitude_col].to_numpy())
+        enriched = [
+            pd.DataFrame(
+                values[bnd], columns=self.columns[bnd], index=df.index, copy=False
+            )
+            for bnd in values
+        ]
+        return pd.concat([df] + enriched, axis=1)
+
+
+class EnrichmentCache:
+    """On-disk cache of Iggy feature values per location.
+
+    Every (iggy_version_id, iggy_prefix, feature) gets one `.npz` file of sorted
+    location keys (latitude/longitude rounded to `precision` decimals) and values,
+    so a lookup is one `np.searchsorted`. Files are touched when used, and the least
+    recently used ones are evicted once the cache directory exceeds `max_bytes`.
+    `hits`/`misses` count looked-up locations.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        iggy_version_id: str,
+        iggy_prefix: str,
+        precision: int = 6,
+        max_bytes: int = 2 * 1024**3,
+    ):
+        self.cache_dir = cache_dir
+        self.iggy_version_id = iggy_version_id
+        self.iggy_prefix = iggy_prefix
+        self.scale = 10**precision
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, feature: str) -> str:
+        name = f"{self.iggy_version_id}_{self.iggy_prefix}_{feature}.npz"
+        return os.path.join(self.cache_dir, name)
+
+    def _keys(self, locations: pd.DataFrame) -> np.ndarray:
+        """One int64 key per rounded (latitude, longitude) row"""
+        lat, lon = np.rint(locations.to_numpy(dtype=np.float64) * self.scale).T
+        lat += 90 * self.scale
+        lon += 180 * self.scale
+        return lat.astype(np.int64) * (360 * self.scale + 1) + lon.astype(np.int64)
+
+    def lookup(
+        self, locations: pd.DataFrame, features: List[str]
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Cached `features` for each (latitude, longitude) row of `locations`, and a
+        mask of the rows that are missing at least one feature"""
+        keys = self._keys(locations)
+        values = np.full((len(keys), len(features)), np.nan)
+        found = np.zeros(values.shape, dtype=bool)
+        for j, feature in enumerate(features):
+            path = self._path(feature)
+            if not os.path.exists(path):
+                continue
+            with np.load(path) as cached:
+                cached_keys, cached_values = cached["keys"], cached["values"]
+            pos = np.minimum(np.searchsorted(cached_keys, keys), len(cached_keys) - 1)
+            found[:, j] = cached_keys[pos] == keys
+            values[found[:, j], j] = cached_values[pos[found[:, j]]]
+            os.utime(path)
+        missing = ~found.all(axis=1)
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+        return pd.DataFrame(values, columns=features, index=locations.index), missing
+
+    def store(self, locations: pd.DataFrame, values: pd.DataFrame) -> None:
+        """Cache the feature `values` enriched for each row of `locations`"""
+        keys = self._keys(locations)
+        for feature in values.columns:
+            path = self._path(feature)
+            new_keys = keys
+            new_values = values[feature].to_numpy(dtype=np.float64)
+            if os.path.exists(path):
+                with np.load(path) as cached:
+                    new_keys = np.concatenate([new_keys, cached["keys"]])
+                    new_values = np.concatenate([new_values, cached["values"]])
+            # np.unique keeps the first occurrence, i.e. the freshly enriched value
+            new_keys, first = np.unique(new_keys, return_index=True)
+            with atomic_path(path) as tmp_path, open(tmp_path, "wb") as f:
+                np.savez(f, keys=new_keys, values=new_values[first])
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used feature files until under `max_bytes`"""
+        evict_lru(self.cache_dir, self.max_bytes, ".npz")
+
+    def report(self) -> None:
+        print(
+            f"Enrichment cache {self.cache_dir}: {self.hits} hits, {self.misses} misses"
+        )
+
+
+def enrich_locations(
+    iggy,
+    df: pd.DataFrame,
+    latitude_col: str = "latitude",
+    longitude_col: str = "longitude",
+    features: Optional[List[str]] = None,
+    cache: Optional[EnrichmentCache] = None,
+) -> pd.DataFrame:
+    """Enrich `df` with a single `iggy.enrich_df` call over its unique locations and
+    broadcast the Iggy columns back to every row, keeping index and row order.
+
+    When `features` is given, `iggy` is loaded with them on first use, only those
+    columns are added, and a `cache` restricts enrichment to the locations it has not
+    seen yet. Otherwise every column `iggy` has loaded is added.
+    """
+    locations, codes = unique_locations(df, latitude_col, longitude_col)
+    if cache is not None and features:
+        iggy_values, missing = cache.lookup(locations, features)
+    else:
+        iggy_values, missing = None, np.ones(locations.shape[0], dtype=bool)
+
+    if missing.any():
+        to_enrich = locations.loc[missing].reset_index(drop=True)
+        print(f"Enriching {to_enrich.shape[0]} unique locations for {df.shape[0]} rows")
+        if features:
+            iggy.load(features=features)
+        enriched = iggy.enrich_df(
+            to_enrich, latitude_col=latitude_col, longitude_col=longitude_col
+        )
+        # with `features` only those are returned, cached or not
+        iggy_cols = features or [
+            c for c in enriched.columns if c not in locations.columns
+        ]
+        if cache is not None and features:
+            cache.store(to_enrich, enriched[features])
+            iggy_values.loc[missing, features] = enriched[features].to_numpy()
+        else:
+            iggy_values = enriched[iggy_cols]
+
+    iggy_values = iggy_values.iloc[codes]
+    iggy_values.index = df.index
+    return pd.concat([df, iggy_values], axis=1)
+
+
+def split_rows(df: pd.DataFrame, sizes: List[int]) -> List[pd.DataFrame]:
+    """Split `df` positionally into consecutive parts of `sizes` rows (the remainder
+    forms the last part)"""
+    bounds = np.cumsum([0] + list(sizes) + [df.shape[0] - sum(sizes)])
+    return [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _read_chunks(input_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Row chunks of a CSV or Parquet file"""
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+def _promote_type(a, b):
+    """Arrow type holding values of types `a` and `b`: numbers widen to int64 or
+    float64, an all-null column takes the other type, anything else becomes string"""
+    import pyarrow as pa
+
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    is_number = lambda t: (
+        pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_boolean(t)
+    )
+    if is_number(a) and is_number(b):
+        if pa.types.is_floating(a) or pa.types.is_floating(b):
+            return pa.float64()
+        return pa.int64()
+    return pa.string()
+
+
+def _promote_schema(schema, other):
+    """`schema` widened to also hold `other`, or `schema` itself if it already does"""
+    import pyarrow as pa
+
+    if schema.names != other.names:
+        raise ValueError(f"Chunk columns {other.names} differ from {schema.names}")
+    types = [_promote_type(a.type, b.type) for a, b in zip(schema, other)]
+    if types == schema.types:
+        return schema
+    # pandas metadata would describe the old types
+    return pa.schema([pa.field(name, t) for name, t in zip(schema.names, types)])
+
+
+def _rewrite_parquet(path: str, schema):
+    """Writer of `path` with `schema`, holding the rows written there so far"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    old_path = f"{path}.{os.getpid()}.old"
+    os.replace(path, old_path)
+    writer = pq.ParquetWriter(path, schema)
+    try:
+        for batch in pq.ParquetFile(old_path).iter_batches():
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+    except Exception:
+        writer.close()
+        raise
+    finally:
+        os.remove(old_path)
+    return writer
+
+
+def enrich_file(
+    iggy,
+    input_path: str,
+    output_path: str,
+    latitude_col: str = "latitude",
+    longitude_col: str = "longitude",
+    features: Optional[List[str]] = None,
+    cache: Optional[EnrichmentCache] = None,
+    chunk_size: int = 500_000,
+) -> int:
+    """Stream a CSV or Parquet file through `enrich_locations` in chunks of
+    `chunk_size` rows and append each enriched chunk to the Parquet file
+    `output_path`, so memory stays bounded by the chunk size. Returns the number of
+    rows written and prints throughput as it goes.
+
+    Column types are inferred per chunk, so the file's schema is widened with
+    `_promote_type` when a chunk does not fit it (e.g. a column empty so far gets
+    strings, or integers get decimals), and the rows written before are rewritten.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, schema, n_rows = None, None, 0
+    start = time.perf_counter()
+    try:
+        for chunk in _read_chunks(input_path, chunk_size):
+            enriched = enrich_locations(
+                iggy, chunk, latitude_col, longitude_col, features, cache
+            )
+            table = pa.Table.from_pandas(enriched, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(output_path, schema)
+            promoted = _promote_schema(schema, table.schema)
+            if promoted is not schema:
+                print(f"Widening column types, rewriting the {n_rows} rows written")
+                writer.close()
+                writer = _rewrite_parquet(output_path, promoted)
+                schema = promoted
+            writer.write_table(table.cast(schema))
+            n_rows += enriched.shape[0]
+            elapsed = time.perf_counter() - start
+            print(
+                f"Enriched {n_rows} rows in {elapsed:.1f}s"
+                f" ({n_rows / elapsed:.0f} rows/s)"
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+
+if __name__ == "__main__":
+    from feature_store import MappedIggyDataPackage
+
+    parser = argparse.ArgumentParser(
+        description="Enrich a CSV or Parquet file of points with Iggy features"
+    )
+    parser.add_argument("input", help="CSV or Parquet file of points")
+    parser.add_argument("output", help="Parquet file to write")
+    parser.add_argument("--iggy-base-loc", default="../iggy-data")
+    parser.add_argument("--iggy-version-id", default="20211110214810")
+    parser.add_argument("--iggy-crosswalk-prefix", default="fl_pinellas_quadkeys")
+    parser.add_argument("--iggy-prefix", default="fl_pinellas_quadkeys")
+    parser.add_argument(
+        "--features", type=json.loads, default=[], help="JSON list of Iggy features"
+    )
+    parser.add_argument("--latitude-col", default="latitude")
+    parser.add_argument("--longitude-col", default="longitude")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="enrichment processes per chunk"
+    )
+    parser.add_argument(
+        "--enrichment-cache",
+        default=None,
+        help="directory of an EnrichmentCache to reuse (requires --features)",
+    )
+    args = parser.parse_args()
+
+    package = MappedIggyDataPackage(
+        args.iggy_version_id,
+        args.iggy_crosswalk_prefix,
+        args.iggy_base_loc,
+        args.iggy_prefix,
+    )
+    iggy = QuadkeyIndex(package, n_workers=args.workers)
+    iggy.load(features=args.features)
+    cache = None
+    if args.enrichment_cache and args.features:
+        cache = EnrichmentCache(
+            args.enrichment_cache, args.iggy_version_id, args.iggy_prefix
+        )
+    enrich_file(
+        iggy,
+        args.input,
+        args.output,
+        args.latitude_col,
+        args.longitude_col,
+        args.features or None,
+        cache,
+        args.chunk_size,
+    )
+    iggy.close()
+    if cache is not None:
+        cache.report()
@@ -0,0 +1,149 @@
+import os
+import pandas as pd
+from typing import Dict, List, Optional
+from file_utils import write_ipc_file
+
+FEATURE_STORE_LOCATION = "./iggy_feature_store"
+
+
+def _write_ipc(df: pd.DataFrame, path: str) -> None:
+    """Write `df` as an uncompressed (memory-mappable) Arrow IPC file, atomically"""
+    import pyarrow as pa
+
+    write_ipc_file(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def _read_ipc(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file and convert only `columns` to pandas. Columns
+    without nulls stay backed by the shared file pages"""
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+class MappedIggyDataPackage:
+    """Stand-in for `LocalIggyDataPackage` that reads the package through Arrow IPC
+    copies of its parquet files.
+
+    Each boundary is converted once, on first use, to `{store_loc}/{boundary}.arrow`
+    and memory-mapped afterwards, so only the requested feature columns are
+    materialized and flow processes on one host share the file pages. Geometry is
+    skipped unless `geometry_{boundary}` is requested. `crosswalk_data`,
+    `boundary_data` and `bounds_features` follow `LocalIggyDataPackage`.
+    """
+
+    def __init__(
+        self,
+        iggy_version_id: str,
+        crosswalk_prefix: str,
+        base_loc: str,
+        iggy_prefix: str = "unified",
+        store_loc: Optional[str] = None,
+    ):
+        self.iggy_version_id = iggy_version_id
+        self.crosswalk_prefix = crosswalk_prefix
+        self.iggy_prefix = iggy_prefix
+        suffix = f"_{iggy_prefix}" if iggy_prefix != "unified" else ""
+        package_dir = f"iggy-package-wkt-{iggy_version_id}{suffix}"
+        self.data_loc = os.path.join(base_loc, package_dir)
+        self.store_loc = store_loc or os.path.join(FEATURE_STORE_LOCATION, package_dir)
+        self.crosswalk_data: Optional[pd.DataFrame] = None
+        self.boundary_data: Dict[str, pd.DataFrame] = {}
+        self.bounds_features: Dict[str, List[str]] = {}
+        self.geometry: Dict[str, pd.Series] = {}
+        os.makedirs(self.store_loc, exist_ok=True)
+
+    def _store_path(self, name: str, source: str) -> str:
+        """Arrow IPC copy of the parquet file `source`, converted if missing"""
+        path = os.path.join(self.store_loc, f"{name}.arrow")
+        if not os.path.exists(path):
+            print(f"Converting {source} to {path}...")
+            _write_ipc(pd.read_parquet(source), path)
+        return path
+
+    def boundary_path(self, boundary: str) -> str:
+        source = os.path.join(
+            self.data_loc, f"{self.iggy_prefix}_{boundary}_{self.iggy_version_id}"
+        )
+        return self._store_path(boundary, source)
+
+    def read_boundary(
+        self, boundary: str, features: List[str] = [], geometry: bool = False
+    ) -> pd.DataFrame:
+        """Boundary table with `_{boundary}` suffixed columns: the `features` (all
+        non-geometry columns if empty) plus `id_{boundary}`"""
+        import pyarrow as pa
+
+        path = self.boundary_path(boundary)
+        with pa.memory_map(path) as source:
+            names = pa.ipc.open_file(source).schema.names
+        if features:
+            wanted = {f[: -len(boundary) - 1] for f in features} | {"id"}
+            columns = [c for c in names if c in wanted]
+        else:
+            columns = [c for c in names if c != "geometry" or geometry]
+        df = _read_ipc(path, columns)
+        df.columns = [f"{c}_{boundary}" for c in df.columns]
+        return df
+
+    def read_geometry(self, boundary: str) -> pd.Series:
+        """Geometries of a boundary as a GeoSeries (WGS84) indexed by `id_{boundary}`.
+
+        On first use the WKT column is parsed in one vectorized call (pygeos or
+        shapely 2 under geopandas) and cached as WKB in the store, which is per
+        package version, so later reads only decode WKB. Parsed series are kept
+        in `geometry`.
+        """
+        import geopandas as gpd
+
+        if boundary not in self.geometry:
+            path = os.path.join(self.store_loc, f"{boundary}_geometry.arrow")
+            if not os.path.exists(path):
+                df = _read_ipc(self.boundary_path(boundary), ["id", "geometry"])
+                wkb = gpd.GeoSeries.from_wkt(df["geometry"]).to_wkb()
+                _write_ipc(pd.DataFrame({"id": df["id"], "wkb": wkb}), path)
+            df = _read_ipc(path)
+            geometry = gpd.GeoSeries.from_wkb(df["wkb"], crs="WGS84")
+            geometry.index = pd.Index(df["id"], name=f"id_{boundary}")
+            self.geometry[boundary] = geometry.rename(f"geometry_{boundary}")
+        return self.geometry[boundary]
+
+    def read_crosswalk(self) -> pd.DataFrame:
+        """Crosswalk quadkey ids and their boundary ids, without geometry"""
+        import pyarrow as pa
+
+        source = os.path.join(
+            self.data_loc, f"{self.crosswalk_prefix}_{self.iggy_version_id}"
+        )
+        path = self._store_path(f"{self.crosswalk_prefix}_crosswalk", source)
+        with pa.memory_map(path) as mapped:
+            names = pa.ipc.open_file(mapped).schema.names
+        columns = [c for c in names if c == "id" or c.endswith("_id")]
+        return _read_ipc(path, columns).set_index("id")
+
+    def load(self, boundaries: List[str] = [], features: List[str] = []) -> None:
+        """Load the crosswalk and selected features / boundaries (all if neither
+        specified), as `LocalIggyDataPackage.load` does"""
+        from iggyenrich.iggy_data_package import infer_bounds
+
+        if self.crosswalk_data is None:
+            self.crosswalk_data = self.read_crosswalk()
+            print(f"Loaded {self.crosswalk_data.shape[0]} crosswalk quadkeys")
+
+        bounds_features = infer_bounds(boundaries, features)
+        for boundary, boundary_features in bounds_features.items():
+            if boundary_features != self.bounds_features.get(boundary):
+                geometry = f"geometry_{boundary}" in boundary_features
+                df = self.read_boundary(boundary, boundary_features, geometry)
+                self.boundary_data[boundary] = df
+                print(
+                    f"Loaded boundary {boundary} with {df.shape[0]} rows"
+                    f" and {df.shape[1]} columns"
+                )
+        for boundary in set(self.boundary_data) - set(bounds_features):
+            del self.boundary_data[boundary]
+        self.bounds_features = bounds_features
@@ -0,0 +1,50 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """Temporary path to write in place of `path`, moved over it once the block
+    exits without error, so readers (and memory maps of the previous file) never
+    see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_ipc_file(table, path: str) -> None:
+    """Write a pyarrow `table` as an uncompressed (memory-mappable) Arrow IPC file,
+    atomically"""
+    import pyarrow as pa
+
+    with atomic_path(path) as tmp_path:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+def evict_lru(directory: str, max_bytes: int, suffix: str, keep: List[str] = []):
+    """Delete the least recently modified `suffix` files under `directory`, except
+    the paths in `keep`, until the rest total at most `max_bytes`"""
+    if not os.path.isdir(directory):
+        return
+    files = [
+        os.path.join(root, name)
+        for root, __, names in os.walk(directory)
+        for name in names
+        if name.endswith(suffix)
+    ]
+    files.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(path) for path in files)
+    for path in files:
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        total -= os.path.getsize(path)
+        os.remove(path)
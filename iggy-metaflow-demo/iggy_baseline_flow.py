@@ -7,27 +7,17 @@ class IggyBaselineFlow(FlowSpec, IggyFlow):
     def start(self):
         # Load Data
         self.file_prefix = "baseline"
-        data, scaled_features = self.load_data(drop_cols=True)
-        self.dataset = LoadedDataset(data, scaled_features)
+        cache = self.cached_step()
+        if not cache.restore(self):
+            data, scaler = self.load_data(drop_cols=True)
+            self.dataset = LoadedDataset(data, scaler)
+            cache.save(self)
         self.next(self.feature_selection)
 
     @step
     def feature_selection(self):
-        (
-            X_train,
-            y_train,
-            X_val,
-            y_val,
-            X_test,
-            y_test,
-        ) = self.dataset[0]
-
-        # Feature Selection
-        (X_train, X_val, X_test), selected_features = self.select_features(
-            X_train, y_train, X_val, y_val, X_test, y_test
-        )
-        self.selected_features = selected_features
-        self.dataset = LoadedDataset(
+        cache = self.cached_step(["dataset"], ["dataset", "selected_features"])
+        if not cache.restore(self):
             (
                 X_train,
                 y_train,
@@ -35,9 +25,25 @@ class IggyBaselineFlow(FlowSpec, IggyFlow):
                 y_val,
                 X_test,
                 y_test,
-            ),
-            self.dataset[1],
-        )
+            ) = self.dataset[0]
+
+            # Feature Selection
+            (X_train, X_val, X_test), selected_features = self.select_features(
+                X_train, y_train, X_val, y_val, X_test, y_test
+            )
+            self.selected_features = selected_features
+            self.dataset = LoadedDataset(
+                (
+                    X_train,
+                    y_train,
+                    X_val,
+                    y_val,
+                    X_test,
+                    y_test,
+                ),
+                self.dataset[1],
+            )
+            cache.save(self)
         self.next(self.train_model)
 
     @step
@@ -53,12 +59,12 @@ class IggyBaselineFlow(FlowSpec, IggyFlow):
             X_test,
             y_test,
         ) = self.dataset.data
-        scaled_features = self.dataset.scaled_features
+        scaler = self.dataset.scaler
         # Tain model
         model = self.train(X_train, y_train, X_val, y_val)
 
         # Eval Model
-        mean, std = scaled_features[self.label_col]
+        mean, std = scaler[self.label_col]
         result = self.eval(model, X_test, y_test, mean, std)
         print(f"Test result: {result}")
 
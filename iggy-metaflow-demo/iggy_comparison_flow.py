@@ -0,0 +1,151 @@
+from iggy_metaflow_base import IggyFlow, LoadedDataset
+from metaflow import FlowSpec, step, catch
+
+
+class IggyComparisonFlow(FlowSpec, IggyFlow):
+    """Loads and enriches the benchmark data once, then trains the baseline,
+    enriched and per-district models as parallel branches and joins their metrics
+    and feature importances into the `comparison` table"""
+
+    @step
+    def start(self):
+        # Load Data
+        cache = self.cached_step()
+        if not cache.restore(self):
+            data, scaler = self.load_data(drop_cols=False)
+            self.dataset = LoadedDataset(data, scaler)
+            cache.save(self)
+        self.next(self.enrich)
+
+    @step
+    def enrich(self):
+        cache = self.cached_step(["dataset"], ["dataset", "baseline_dataset"])
+        if not cache.restore(self):
+            (
+                X_train,
+                y_train,
+                X_val,
+                y_val,
+                X_test,
+                y_test,
+            ) = self.dataset.data
+
+            # the baseline model uses the loaded features without locations
+            self.baseline_dataset = LoadedDataset(
+                (
+                    X_train.drop(self.location_cols, axis=1),
+                    y_train,
+                    X_val.drop(self.location_cols, axis=1),
+                    y_val,
+                    X_test.drop(self.location_cols, axis=1),
+                    y_test,
+                ),
+                self.dataset.scaler,
+            )
+
+            # Run Iggy Feature Enrichment
+            X_train, X_val, X_test = self.iggy_enrich(
+                X_train, y_train, X_val, y_val, X_test, y_test
+            )
+            self.dataset = LoadedDataset(
+                (
+                    X_train,
+                    y_train,
+                    X_val,
+                    y_val,
+                    X_test,
+                    y_test,
+                ),
+                self.dataset.scaler,
+            )
+            cache.save(self)
+        self.scaler = self.dataset.scaler
+        self.next(self.baseline, self.enriched, self.segment)
+
+    @step
+    def baseline(self):
+        self.fit_and_evaluate("baseline", *self.baseline_dataset.data)
+        self.next(self.join)
+
+    @step
+    def enriched(self):
+        self.fit_and_evaluate("enriched", *self.dataset.data)
+        self.next(self.join)
+
+    @step
+    def segment(self):
+        # Split the rows by tax district; each foreach task only loads its own
+        self.district_shards = self.district_datasets()
+        self.next(self.district_model, foreach="district_shards")
+
+    @catch(var="exception")
+    @step
+    def district_model(self):
+        self.exception = None
+        tax_dst, dataset = self.input
+        self.fit_and_evaluate(f"district: {tax_dst}", *dataset.data)
+        self.next(self.district_join)
+
+    @step
+    def district_join(self, inputs):
+        self.metrics = []
+        self.feature_importances = {}
+        for inp in inputs:
+            # If there was an exception don't report the district.
+            if inp.exception:
+                continue
+            self.metrics.extend(inp.metrics)
+            self.feature_importances.update(inp.feature_importances)
+        self.next(self.join)
+
+    @step
+    def join(self, inputs):
+        import pandas as pd
+
+        metrics = []
+        feature_importances = {}
+        for inp in inputs:
+            metrics.extend(inp.metrics)
+            feature_importances.update(inp.feature_importances)
+        fw = pd.DataFrame.from_dict(feature_importances, orient="index").fillna(0)
+        self.comparison = pd.DataFrame(metrics).set_index("model").join(fw)
+        with pd.option_context("display.max_columns", 4, "display.width", 120):
+            print(self.comparison)
+        self.comparison.to_csv(
+            "feature_importances/comparison.csv", index_label="model"
+        )
+        self.next(self.end)
+
+    @step
+    def end(self):
+        print("Done Computation")
+
+    def fit_and_evaluate(self, name, X_train, y_train, X_val, y_val, X_test, y_test):
+        """Select features, train and evaluate the `name` model, setting its
+        `metrics` row and `feature_importances`"""
+        (X_train, X_val, X_test), selected_features = self.select_features(
+            X_train, y_train, X_val, y_val, X_test, y_test
+        )
+        model = self.train(X_train, y_train, X_val, y_val)
+
+        mean, std = self.scaler[self.label_col]
+        val_result = self.eval(model, X_val, y_val, mean, std)
+        test_result = self.eval(model, X_test, y_test, mean, std)
+        print(f"** Results for {name} **")
+        print(test_result)
+        self.metrics = [
+            {
+                "model": name,
+                "val_mse": val_result["test_loss"],
+                "test_mse": test_result["test_loss"],
+                # only set by eval when the label is scaled
+                "test_unscaled_mae": test_result.get("test_unscaled_mae"),
+            }
+        ]
+        self.feature_importances = {
+            name: dict(zip(selected_features, model.feature_importances_))
+        }
+
+
+if __name__ == "__main__":
+    IggyComparisonFlow()
@@ -1,8 +1,9 @@
 from metaflow import JSONType, Parameter
 import json
-from collections import namedtuple
+from typing import Dict, List, Optional
+from dataset_store import LoadedDataset
 
-LoadedDataset = namedtuple("LoadedDataset", "data scaled_features")
+PREPROCESS_FLOW = "IggyPreprocessFlow"
 
 IGGY_DATA_BASE_LOCATION = "../iggy-data"
 BENCHMARK_DATA_LOCATION = "./data/benchmark/iggy_re_salesprice_pinellas_20211203.csv"
@@ -40,6 +41,19 @@ class IggyFlow:
 
     model_dim = 50
 
+    columnar_cache = True
+
+    compact_dataset = True
+
+    imputation_method = "geo"
+
+    feature_score_cache = "./feature_scores"
+
+    enrichment_cache = "./enrichment_cache"
+
+    # memoized step outputs, None to always recompute
+    step_cache = "./step_cache"
+
     iggy_config = Parameter(
         "iggy-config",
         type=JSONType,
@@ -66,17 +80,139 @@ class IggyFlow:
         default=BENCHMARK_DATA_LOCATION,
     )
 
+    train_workers = Parameter(
+        "train-workers",
+        type=int,
+        help="processes for the max-depth sweep (0 uses one per candidate/core)",
+        default=0,
+    )
+
+    enrich_workers = Parameter(
+        "enrich-workers",
+        type=int,
+        help="processes for Iggy enrichment of large batches (1 enriches in the step)",
+        default=1,
+    )
+
+    train_search = Parameter(
+        "train-search",
+        help="max-depth search: `grid` fits every candidate, `halving` prunes early",
+        default="grid",
+    )
+
+    preprocess_run = Parameter(
+        "preprocess-run",
+        help=f"{PREPROCESS_FLOW} run id (or `latest`) whose dataset to use instead of"
+        " loading the benchmark data",
+        default="",
+    )
+
+    def load_params(self) -> Dict:
+        """Parameters and settings that shape the loaded dataset, with the size and
+        modification time of the benchmark file (local or on S3), or None for them
+        when they cannot be determined"""
+        import os
+
+        params = {
+            name: getattr(self, name)
+            for name in [
+                "benchmark_data_path",
+                "label_col",
+                "location_cols",
+                "columnar_cache",
+                "compact_dataset",
+            ]
+        }
+        params["benchmark_data_stat"] = None
+        if os.path.isfile(self.benchmark_data_path):
+            stat = os.stat(self.benchmark_data_path)
+            params["benchmark_data_stat"] = (stat.st_size, stat.st_mtime_ns)
+        elif self.benchmark_data_path.startswith("s3://"):
+            from metaflow import S3
+
+            try:
+                with S3() as s3:
+                    info = s3.info(self.benchmark_data_path)
+                params["benchmark_data_stat"] = (info.size, info.last_modified)
+            except Exception as e:  # Metaflow S3 errors, missing credentials
+                print(f"Cannot stat {self.benchmark_data_path}: {e}")
+        return params
+
+    def cached_step(self, inputs: List[str] = [], outputs: List[str] = ["dataset"]):
+        """`StepCache` of the current step, fingerprinted by the parameters and
+        settings that shape the data, the benchmark file, the `inputs` artifacts and
+        the code version. Steps use it as
+
+            cache = self.cached_step(["dataset"])
+            if not cache.restore(self):
+                ...  # compute self.dataset
+                cache.save(self)
+        """
+        from metaflow import current
+        from step_cache import StepCache, step_fingerprint
+
+        params = self.load_params()
+        for name in [
+            "iggy_config",
+            "iggy_features",
+            "s3_data_base_path",
+            "model_dim",
+            "imputation_method",
+        ]:
+            params[name] = getattr(self, name)
+        fingerprint = step_fingerprint(self, current.step_name, params, inputs)
+        cache_dir = self.step_cache
+        if cache_dir and params["benchmark_data_stat"] is None:
+            # an unknown benchmark file version could restore stale data
+            print("Benchmark file version unknown, not using the step cache")
+            cache_dir = None
+        return StepCache(cache_dir, self, current.step_name, fingerprint, outputs)
+
+    def preprocessed_dataset(self) -> Optional[LoadedDataset]:
+        """`dataset` artifact of the `preprocess_run` run of the preprocessing flow,
+        or None if its splits are no longer in the dataset store. Only its split keys
+        are read; the splits are loaded from the dataset store on first access"""
+        from metaflow import Flow, Run
+
+        if self.preprocess_run == "latest":
+            run = Flow(PREPROCESS_FLOW).latest_successful_run
+        else:
+            run = Run(f"{PREPROCESS_FLOW}/{self.preprocess_run}")
+        if run is None:
+            raise ValueError(f"No successful {PREPROCESS_FLOW} run")
+        params = json.loads(json.dumps(self.load_params()))
+        if run.data.dataset_params != params:
+            raise ValueError(
+                f"{run.pathspec} was preprocessed with {run.data.dataset_params},"
+                f" this flow expects {params}"
+            )
+        dataset = run.data.dataset
+        if not dataset.available():
+            print(
+                f"The dataset splits of {run.pathspec} are no longer in the dataset"
+                f" store {dataset.store_loc}, loading the benchmark data instead"
+            )
+            return None
+        print(f"Using the dataset of {run.pathspec} ({run.data.dataset_version[:12]})")
+        return dataset
+
     def load_data(self, drop_cols=True):
         # load dataset
         from utils import load_dataset
 
-        data, scaled_features = load_dataset(
-            self.benchmark_data_path,
-            self.label_col,
-            "split",
-            debug=False,
-            location_cols=self.location_cols,
-        )
+        dataset = self.preprocessed_dataset() if self.preprocess_run else None
+        if dataset is not None:
+            data, scaler = dataset
+        else:
+            data, scaler = load_dataset(
+                self.benchmark_data_path,
+                self.label_col,
+                "split",
+                debug=False,
+                location_cols=self.location_cols,
+                columnar_cache=self.columnar_cache,
+                compact=self.compact_dataset,
+            )
         (
             X_train,
             y_train,
@@ -98,7 +234,7 @@ class IggyFlow:
                 X_test,
                 y_test,
             ),
-            scaled_features,
+            scaler,
         )
 
     def select_features(self, X_train, y_train, X_val, y_val, X_test, y_test):
@@ -106,43 +242,86 @@ class IggyFlow:
         from utils import feature_selection
 
         (X_train, X_val, X_test), selected_features = feature_selection(
-            [X_train, X_val, X_test], y_train, self.model_dim
+            [X_train, X_val, X_test],
+            y_train,
+            self.model_dim,
+            cache_dir=self.feature_score_cache,
         )
         return (X_train, X_val, X_test), selected_features
 
     def train(self, X_train, y_train, X_val, y_val):
         from utils import train
 
-        return train(X_train, y_train, X_val, y_val)
+        return train(
+            X_train,
+            y_train,
+            X_val,
+            y_val,
+            n_workers=self.train_workers or None,
+            search=self.train_search,
+        )
 
     def iggy_enrich(self, X_train, y_train, X_val, y_val, X_test, y_test):
-        from iggyenrich.iggy_enrich import IggyEnrich
-        from iggyenrich.iggy_data_package import LocalIggyDataPackage
-        from utils import impute_missing_values, scale_continuous_values
+        import pandas as pd
+        from feature_store import MappedIggyDataPackage
+        from enrichment import (
+            EnrichmentCache,
+            QuadkeyIndex,
+            enrich_locations,
+            split_rows,
+        )
+        from utils import CompactFrame, impute_missing_values, scale_continuous_values
+
+        # enrichment, imputation and scaling only touch the dense columns of compact
+        # splits; their one-hot groups are carried over as is
+        compact_splits = None
+        if isinstance(X_train, CompactFrame):
+            compact_splits = (X_train, X_val, X_test)
+            X_train, X_val, X_test = (X.dense for X in compact_splits)
 
         config = dict(self.iggy_config)
         config["base_loc"] = self.s3_data_base_path
-        iggy = IggyEnrich(iggy_package=LocalIggyDataPackage(**config))
-        iggy.load(features=IGGY_FEATURES)
+        iggy = QuadkeyIndex(
+            MappedIggyDataPackage(**config), n_workers=self.enrich_workers
+        )
+        cache = EnrichmentCache(
+            self.enrichment_cache, config["iggy_version_id"], config["iggy_prefix"]
+        )
 
-        X_train = iggy.enrich_df(X_train)
-        X_train.drop(self.location_cols, axis=1, inplace=True)
-        X_train, scaled_enriched_features = scale_continuous_values(
-            impute_missing_values(X_train)
+        # enrich all splits in one pass over their unique locations; the Iggy
+        # package is only loaded if some of them are not cached yet
+        X_train, X_val, X_test = split_rows(
+            enrich_locations(
+                iggy,
+                pd.concat([X_train, X_val, X_test]),
+                features=list(self.iggy_features),
+                cache=cache,
+            ),
+            [X_train.shape[0], X_val.shape[0]],
         )
+        iggy.close()
+        cache.report()
 
-        X_val = iggy.enrich_df(X_val)
-        X_val.drop(self.location_cols, axis=1, inplace=True)
-        X_val, __ = scale_continuous_values(
-            impute_missing_values(X_val), scaled_features=scaled_enriched_features
+        # impute while location columns are still available for geo neighbours
+        X_train, imputer = impute_missing_values(
+            X_train, self.imputation_method, location_cols=self.location_cols
         )
+        X_train.drop(self.location_cols, axis=1, inplace=True)
+        X_train, enriched_scaler = scale_continuous_values(X_train)
+
+        X_val, __ = impute_missing_values(X_val, imputer=imputer)
+        X_val.drop(self.location_cols, axis=1, inplace=True)
+        X_val, __ = scale_continuous_values(X_val, scaler=enriched_scaler)
 
-        X_test = iggy.enrich_df(X_test)
+        X_test, __ = impute_missing_values(X_test, imputer=imputer)
         X_test.drop(self.location_cols, axis=1, inplace=True)
-        X_test, __ = scale_continuous_values(
-            impute_missing_values(X_test), scaled_features=scaled_enriched_features
-        )
+        X_test, __ = scale_continuous_values(X_test, scaler=enriched_scaler)
 
+        if compact_splits is not None:
+            X_train, X_val, X_test = (
+                X.with_dense(dense)
+                for X, dense in zip(compact_splits, (X_train, X_val, X_test))
+            )
         return X_train, X_val, X_test
 
     def eval(self, model, X_test, y_test, mean, std):
@@ -150,7 +329,39 @@ class IggyFlow:
 
         return eval(model, X_test, y_test, mean, std)
 
-    def segment_df(self, x, y, col):
+    def segment_df(self, x, y, col, min_rows=0):
         from utils import segment_df
 
-        return segment_df(x, y, col)
+        return segment_df(x, y, col, min_rows)
+
+    def segment_indices(self, x, col, min_rows=0):
+        from utils import segment_indices
+
+        return segment_indices(x, col, min_rows)
+
+    def take_segment(self, x, y, rows, col):
+        from utils import take_segment
+
+        return take_segment(x, y, rows, col)
+
+    def district_datasets(self, tax_col="current_tax_district_dscr_", min_rows=850):
+        """(district, `LoadedDataset`) of every tax district of `self.dataset` with
+        at least `min_rows` training rows, without the district one-hot columns. As a
+        foreach artifact they only carry the keys of their splits in the dataset
+        store, so each task loads just its own district"""
+        X_train, y_train, X_val, y_val, X_test, y_test = self.dataset.data
+        train_segments = self.segment_indices(X_train, tax_col, min_rows=min_rows)
+        val_segments = self.segment_indices(X_val, tax_col)
+        test_segments = self.segment_indices(X_test, tax_col)
+
+        districts = []
+        for district, train_rows in train_segments.items():
+            data = []
+            for X, y, rows in [
+                (X_train, y_train, train_rows),
+                (X_val, y_val, val_segments[district]),
+                (X_test, y_test, test_segments[district]),
+            ]:
+                data.extend(self.take_segment(X, y, rows, tax_col))
+            districts.append((district, LoadedDataset(data, self.dataset.scaler)))
+        return districts
@@ -9,26 +9,17 @@ class IggyPerDistrictFlow(FlowSpec, IggyFlow):
         from metaflow import S3
 
         # Load Data
-        data, scaled_features = self.load_data(drop_cols=False)
-        self.dataset = LoadedDataset(data, scaled_features)
+        cache = self.cached_step()
+        if not cache.restore(self):
+            data, scaler = self.load_data(drop_cols=False)
+            self.dataset = LoadedDataset(data, scaler)
+            cache.save(self)
         self.next(self.enrich)
 
     @step
     def enrich(self):
-        (
-            X_train,
-            y_train,
-            X_val,
-            y_val,
-            X_test,
-            y_test,
-        ) = self.dataset.data
-
-        # Run Iggy Feature Enrichment
-        X_train, X_val, X_test = self.iggy_enrich(
-            X_train, y_train, X_val, y_val, X_test, y_test
-        )
-        self.dataset = LoadedDataset(
+        cache = self.cached_step(["dataset"])
+        if not cache.restore(self):
             (
                 X_train,
                 y_train,
@@ -36,43 +27,41 @@ class IggyPerDistrictFlow(FlowSpec, IggyFlow):
                 y_val,
                 X_test,
                 y_test,
-            ),
-            self.dataset.scaled_features,
-        )
+            ) = self.dataset.data
+
+            # Run Iggy Feature Enrichment
+            X_train, X_val, X_test = self.iggy_enrich(
+                X_train, y_train, X_val, y_val, X_test, y_test
+            )
+            self.dataset = LoadedDataset(
+                (
+                    X_train,
+                    y_train,
+                    X_val,
+                    y_val,
+                    X_test,
+                    y_test,
+                ),
+                self.dataset.scaler,
+            )
+            cache.save(self)
         self.next(self.segment)
 
     @step
     def segment(self):
-        (
-            X_train,
-            y_train,
-            X_val,
-            y_val,
-            X_test,
-            y_test,
-        ) = self.dataset.data
-        # Extract features according to districts
-        tax_col = "current_tax_district_dscr_"
-        self.train_data = self.segment_df(X_train, y_train, tax_col)
-        self.val_data = self.segment_df(X_val, y_val, tax_col)
-        self.test_data = self.segment_df(X_test, y_test, tax_col)
-        self.keep_districts = [
-            k for k, v in self.train_data.items() if v[0].shape[0] >= 850
-        ]
-        self.scaled_features = self.dataset.scaled_features
-        self.next(self.feature_selection_and_train_model, foreach="keep_districts")
+        # Split the rows by tax district; each foreach task only loads its own
+        self.district_shards = self.district_datasets()
+        self.scaler = self.dataset.scaler
+        self.next(self.feature_selection_and_train_model, foreach="district_shards")
 
     @catch(var="exception")
     @step
     def feature_selection_and_train_model(self):
         # Train Many Models
-
         self.exception = None
-        tax_dst, self.tax_district = self.input, self.input
-
-        X_train, y_train = self.train_data[tax_dst]
-        X_val, y_val = self.val_data[tax_dst]
-        X_test, y_test = self.test_data[tax_dst]
+        tax_dst, dataset = self.input
+        self.tax_district = tax_dst
+        X_train, y_train, X_val, y_val, X_test, y_test = dataset.data
 
         # feature selection
         (X_train, X_val, X_test), selected_features = self.select_features(
@@ -83,7 +72,7 @@ class IggyPerDistrictFlow(FlowSpec, IggyFlow):
         self.model = self.train(X_train, y_train, X_val, y_val)
 
         # eval
-        mean, std = self.scaled_features[self.label_col]
+        mean, std = self.scaler[self.label_col]
         result = self.eval(self.model, X_test, y_test, mean, std)
         print(f"** Results for tax district {tax_dst} **")
         print(result)
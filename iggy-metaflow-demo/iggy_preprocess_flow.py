@@ -0,0 +1,28 @@
+from iggy_metaflow_base import IggyFlow, LoadedDataset
+from metaflow import FlowSpec, step
+import json
+
+
+class IggyPreprocessFlow(FlowSpec, IggyFlow):
+    """Loads, splits and scales the benchmark data once. The other flows use its
+    `dataset` with `--preprocess-run <run id or latest>`"""
+
+    @step
+    def start(self):
+        # Load Data, keeping the location columns needed for enrichment
+        cache = self.cached_step()
+        if not cache.restore(self):
+            data, scaler = self.load_data(drop_cols=False)
+            self.dataset = LoadedDataset(data, scaler)
+            cache.save(self)
+        self.dataset_params = json.loads(json.dumps(self.load_params()))
+        self.dataset_version = cache.fingerprint
+        self.next(self.end)
+
+    @step
+    def end(self):
+        print(f"Preprocessed dataset {self.dataset_version[:12]}")
+
+
+if __name__ == "__main__":
+    IggyPreprocessFlow()
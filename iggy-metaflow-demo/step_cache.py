@@ -0,0 +1,109 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from typing import Dict, List, Optional
+from file_utils import atomic_path
+
+# modules whose code the flow steps run; editing any of them invalidates the cache
+STEP_CODE_MODULES = [
+    "utils.py",
+    "enrichment.py",
+    "feature_store.py",
+    "dataset_store.py",
+    "iggy_metaflow_base.py",
+]
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def code_version(flow, step_name: str) -> Dict[str, str]:
+    """Hashes of the step's source and of `STEP_CODE_MODULES`"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    version = {
+        "step": _sha256(inspect.getsource(getattr(type(flow), step_name)).encode())
+    }
+    for module in STEP_CODE_MODULES:
+        with open(os.path.join(base_dir, module), "rb") as f:
+            version[module] = _sha256(f.read())
+    return version
+
+
+def artifact_hash(value) -> str:
+    """Hash of an artifact's pickled value. A `LoadedDataset` whose splits were not
+    loaded is hashed by its split keys, which are content hashes already, since
+    pickling it would serialize and store every split again"""
+    from dataset_store import LoadedDataset
+
+    if isinstance(value, LoadedDataset) and value.stored_keys() is not None:
+        scaler = pickle.dumps(value.scaler, protocol=4)
+        return _sha256(json.dumps(value.stored_keys()).encode() + scaler)
+    return _sha256(pickle.dumps(value, protocol=4))
+
+
+def step_fingerprint(flow, step_name: str, params: Dict, inputs: List[str]) -> str:
+    """Fingerprint of a step run: its code version, `params` and the hash of each
+    input artifact"""
+    parts = {
+        "flow": type(flow).__name__,
+        "step": step_name,
+        "code": code_version(flow, step_name),
+        "params": params,
+        "inputs": {name: artifact_hash(getattr(flow, name)) for name in inputs},
+    }
+    return _sha256(json.dumps(parts, sort_keys=True, default=str).encode())
+
+
+class StepCache:
+    """Artifacts a step produced under a given fingerprint, stored in
+    `{cache_dir}/{flow}/{step}/{fingerprint}.pkl`. `restore` sets them on the flow
+    if the fingerprint was seen before, otherwise the step runs and calls `save`.
+    Without a `cache_dir` nothing is restored or saved"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str],
+        flow,
+        step_name: str,
+        fingerprint: str,
+        outputs: List[str],
+    ):
+        self.path = cache_dir and os.path.join(
+            cache_dir, type(flow).__name__, step_name, f"{fingerprint}.pkl"
+        )
+        self.step_name = step_name
+        self.fingerprint = fingerprint
+        self.outputs = list(outputs)
+
+    def restore(self, flow) -> bool:
+        from dataset_store import LoadedDataset
+
+        if self.path is None:
+            return False
+        if not os.path.exists(self.path):
+            print(f"Step cache miss for {self.step_name} ({self.fingerprint[:12]})")
+            return False
+        with open(self.path, "rb") as f:
+            artifacts = pickle.load(f)
+        for value in artifacts.values():
+            if isinstance(value, LoadedDataset) and not value.available():
+                print(f"Step cache entry for {self.step_name} lost its dataset splits")
+                return False
+        for name, value in artifacts.items():
+            setattr(flow, name, value)
+        print(
+            f"Restored step {self.step_name} from the step cache"
+            f" ({self.fingerprint[:12]})"
+        )
+        return True
+
+    def save(self, flow) -> None:
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        artifacts = {name: getattr(flow, name) for name in self.outputs}
+        with atomic_path(self.path) as tmp_path, open(tmp_path, "wb") as f:
+            pickle.dump(artifacts, f, protocol=4)
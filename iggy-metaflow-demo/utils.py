@@ -1,81 +1,813 @@
+import hashlib
+import os
+import time
 import numpy as np
 import pandas as pd
+from collections import namedtuple
 from typing import Dict, List, Optional, Tuple
-from sklearn.impute import KNNImputer
-from sklearn.feature_selection import SelectKBest, mutual_info_regression
+from sklearn.feature_selection import mutual_info_regression
 from sklearn.ensemble import RandomForestRegressor
+from file_utils import atomic_path, write_ipc_file
 
 
 pd.options.mode.chained_assignment = None
 
+CACHE_META_KEYS = (b"source_mtime_ns", b"source_size", b"source_sha256")
+
+# one-hot groups of the benchmark data, matched longest prefix first
+ONEHOT_PREFIXES = [
+    "current_tax_district_dscr_",
+    "frontage_",
+    "views_",
+    "description_",
+    "foundation_",
+    "floor_system_",
+    "exterior_wall_",
+    "roof_frame_",
+    "roof_cover_",
+    "floor_finish_",
+    "interior_finish_",
+    "heating_",
+    "cooling_",
+    "quality_",
+    "sale_day_of_week_",
+    "sale_day_",
+    "sale_month_",
+    "sale_year_",
+    "sale_quarter_",
+]
+
+OneHotGroup = namedtuple("OneHotGroup", "columns codes")
+
+
+def _file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _typed_benchmark_frame(
+    df: pd.DataFrame, index_col: str, split_col: str, location_cols: List[str] = []
+):
+    """Cast benchmark columns to compact dtypes: uint8 for one-hot indicators,
+    float32 for continuous values and a categorical split column. `location_cols`
+    stay float64, as float32 coordinates can fall into a different quadkey"""
+    import pyarrow as pa
+
+    fields = []
+    for col in df.columns:
+        if col in location_cols:
+            df[col] = df[col].astype(np.float64)
+            fields.append(pa.field(col, pa.float64()))
+        elif col == index_col:
+            df[col] = df[col].astype(str)
+            fields.append(pa.field(col, pa.string()))
+        elif col == split_col:
+            df[col] = df[col].astype("category")
+            fields.append(pa.field(col, pa.dictionary(pa.int8(), pa.string())))
+        elif df[col].isin([0, 1]).all():
+            df[col] = df[col].astype(np.uint8)
+            fields.append(pa.field(col, pa.uint8()))
+        else:
+            df[col] = df[col].astype(np.float32)
+            fields.append(pa.field(col, pa.float32()))
+    return df, pa.schema(fields)
+
+
+def _cache_metadata(meta: Dict, stat: os.stat_result, sha256: str) -> Dict:
+    meta = dict(meta)
+    meta.update(
+        zip(CACHE_META_KEYS, (str(stat.st_mtime_ns), str(stat.st_size), sha256))
+    )
+    return meta
+
+
+def read_benchmark_data(
+    file_path: str,
+    index_col: str,
+    split_col: str,
+    cache_path: Optional[str] = None,
+    location_cols: List[str] = [],
+) -> pd.DataFrame:
+    """Read benchmark CSV through a typed Arrow IPC cache, which is memory-mapped on
+    later runs and rebuilt whenever the source file's mtime/size and hash change
+    """
+    import pyarrow as pa
+
+    cache_path = cache_path or os.path.splitext(file_path)[0] + ".arrow"
+    stat = os.stat(file_path)
+    if os.path.exists(cache_path):
+        with pa.memory_map(cache_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        meta = table.schema.metadata or {}
+        mtime_ns, size, sha256 = (meta.get(k, b"").decode() for k in CACHE_META_KEYS)
+        fresh = mtime_ns == str(stat.st_mtime_ns) and size == str(stat.st_size)
+        # caches written before location columns were kept as float64 are rebuilt
+        typed = all(
+            table.schema.field(col).type == pa.float64()
+            for col in location_cols
+            if col in table.schema.names
+        )
+        if typed and not fresh:
+            source_sha256 = _file_sha256(file_path)
+            if sha256 == source_sha256:
+                # same content under a new mtime: record it so the next run
+                # does not hash the file again
+                table = table.replace_schema_metadata(
+                    _cache_metadata(meta, stat, source_sha256)
+                )
+                write_ipc_file(table, cache_path)
+                fresh = True
+        if typed and fresh:
+            print(f"Using columnar cache {cache_path}")
+            return table.to_pandas(split_blocks=True)
+
+    print(f"Building columnar cache {cache_path}...")
+    df, schema = _typed_benchmark_frame(
+        pd.read_csv(file_path), index_col, split_col, location_cols
+    )
+    schema = schema.with_metadata(_cache_metadata({}, stat, _file_sha256(file_path)))
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    write_ipc_file(table, cache_path)
+    return df
+
+
+class CompactFrame:
+    """Feature frame storing each one-hot group as one small-int code per row.
+
+    `groups` maps a column prefix to the group's column names and the position of
+    each row's active column (int8/int16, -1 for none); all other columns stay in
+    the `dense` frame, numeric ones as float32 except for location columns. The
+    original layout is only built when needed: `__getitem__` expands one column,
+    `to_frame` the whole frame, and `select_columns` just the model's columns.
+    `take`, `drop`, `shape` and `index` follow pandas so the pipeline steps accept
+    either.
+    """
+
+    def __init__(
+        self, dense: pd.DataFrame, groups: Dict[str, OneHotGroup], columns: List[str]
+    ):
+        self.dense = dense
+        self.groups = groups
+        self.columns = pd.Index(columns)
+        self._group_of = {
+            col: (prefix, i)
+            for prefix, group in groups.items()
+            for i, col in enumerate(group.columns)
+        }
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        prefixes: List[str] = ONEHOT_PREFIXES,
+        location_cols: List[str] = [],
+    ) -> "CompactFrame":
+        """Encode the `prefixes` groups of `df` whose 0/1 columns have at most one
+        active column per row; other columns are kept dense, numeric ones as float32
+        apart from `location_cols`"""
+        prefixes = sorted(prefixes, key=len, reverse=True)
+        members = {}
+        for col in df.columns:
+            prefix = next((p for p in prefixes if col.startswith(p)), None)
+            if prefix is not None and pd.api.types.is_numeric_dtype(df[col]):
+                members.setdefault(prefix, []).append(col)
+
+        groups = {}
+        for prefix, cols in members.items():
+            onehot = df[cols].to_numpy()
+            if (
+                not ((onehot == 0) | (onehot == 1)).all()
+                or (onehot.sum(axis=1) > 1).any()
+            ):
+                continue
+            dtype = np.int8 if len(cols) < 128 else np.int16
+            codes = onehot.argmax(axis=1).astype(dtype)
+            codes[onehot.max(axis=1) != 1] = -1
+            groups[prefix] = OneHotGroup(cols, codes)
+
+        grouped = {col for group in groups.values() for col in group.columns}
+        dense = df[[c for c in df.columns if c not in grouped]]
+        numeric = [
+            c
+            for c in dense.columns
+            if pd.api.types.is_numeric_dtype(dense[c]) and c not in location_cols
+        ]
+        dense = dense.astype(dict.fromkeys(numeric, np.float32))
+        return cls(dense, groups, list(df.columns))
+
+    @property
+    def index(self) -> pd.Index:
+        return self.dense.index
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.dense.shape[0], len(self.columns)
+
+    def __len__(self) -> int:
+        return self.dense.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.dense.memory_usage(deep=True).sum()) + sum(
+            group.codes.nbytes for group in self.groups.values()
+        )
+
+    def __getitem__(self, col: str) -> pd.Series:
+        if col in self._group_of:
+            prefix, i = self._group_of[col]
+            values = (self.groups[prefix].codes == i).astype(np.uint8)
+            return pd.Series(values, index=self.index, name=col)
+        return self.dense[col]
+
+    def take(self, rows: np.ndarray) -> "CompactFrame":
+        """Rows at positions `rows`"""
+        groups = {
+            prefix: OneHotGroup(group.columns, group.codes[rows])
+            for prefix, group in self.groups.items()
+        }
+        return CompactFrame(self.dense.take(rows), groups, list(self.columns))
+
+    def drop(self, columns: List[str], axis: int = 1, inplace: bool = False):
+        """Drop dense columns and/or whole one-hot groups"""
+        columns = set(columns)
+        groups = {
+            prefix: group
+            for prefix, group in self.groups.items()
+            if not columns.intersection(group.columns)
+        }
+        for prefix in set(self.groups) - set(groups):
+            if not columns.issuperset(self.groups[prefix].columns):
+                raise ValueError(f"Cannot drop part of the one-hot group {prefix}")
+        dense = self.dense.drop([c for c in self.dense.columns if c in columns], axis=1)
+        kept = [c for c in self.columns if c not in columns]
+        if not inplace:
+            return CompactFrame(dense, groups, kept)
+        self.__init__(dense, groups, kept)
+
+    def with_dense(self, dense: pd.DataFrame) -> "CompactFrame":
+        """Same one-hot groups with another dense block (same rows), e.g. after
+        enrichment added Iggy columns to it"""
+        grouped = set(self._group_of)
+        columns = [c for c in self.columns if c in grouped or c in dense.columns]
+        columns += [c for c in dense.columns if c not in self.columns]
+        return CompactFrame(dense, self.groups, columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Dense frame in the original column order, one-hot columns as uint8"""
+        columns = {}
+        for prefix, group in self.groups.items():
+            onehot = np.zeros((len(self), len(group.columns) + 1), dtype=np.uint8)
+            onehot[np.arange(len(self)), group.codes] = 1
+            columns.update(zip(group.columns, onehot[:, :-1].T))
+        expanded = pd.DataFrame(columns, index=self.index)
+        return pd.concat([self.dense, expanded], axis=1)[self.columns]
+
+
+class ContinuousScaler:
+    """Standard scaler for the continuous (non 0/1) columns of a frame. All means and
+    stds are computed in one reduction on `fit` and reused by `transform`, so a
+    scaler fitted on train can be applied to val/test"""
+
+    def __init__(self, n_sample: int = 2000, ignore_cols: List[str] = []):
+        self.n_sample = n_sample
+        self.ignore_cols = list(ignore_cols)
+        self.columns = []
+        self.means = np.empty(0)
+        self.stds = np.empty(0)
+
+    def __getitem__(self, col: str) -> Tuple[float, float]:
+        i = self.columns.index(col)
+        return self.means[i], self.stds[i]
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.columns
+
+    def continuous_columns(self, df: pd.DataFrame) -> List[str]:
+        numeric = [
+            c
+            for c in df.columns
+            if pd.api.types.is_numeric_dtype(df[c])
+            and c != "geometry"
+            and c not in self.ignore_cols
+        ]
+        head = df.head(self.n_sample)[numeric].to_numpy(dtype=np.float64)
+        is_binary = ((head == 0) | (head == 1)).all(axis=0)
+        return [c for c, binary in zip(numeric, is_binary) if not binary]
+
+    def fit(self, df: pd.DataFrame) -> "ContinuousScaler":
+        if isinstance(df, CompactFrame):
+            return self.fit(df.dense)
+        self.columns = self.continuous_columns(df)
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        self.means = np.nanmean(values, axis=0)
+        self.stds = np.nanstd(values, axis=0, ddof=1)
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        if isinstance(df, CompactFrame):
+            # one-hot groups are never scaled; the dense block is scaled in place
+            self.transform(df.dense)
+            return df
+        if not self.columns:
+            return df
+        dtype = np.result_type(np.float32, *df.dtypes[self.columns])
+        values = df[self.columns].to_numpy(dtype=np.float64, copy=True)
+        values -= self.means
+        values /= self.stds
+        df[self.columns] = values.astype(dtype, copy=False)
+        return df
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
 
 def scale_continuous_values(
     df: pd.DataFrame,
     n_sample: int = 2000,
     ignore_cols: List[str] = [],
-    scaled_features: Dict = {},
-) -> Tuple[pd.DataFrame, Dict]:
-    continuous_cols = df.columns[~df.head(n_sample).isin([0, 1]).all()]
-    for col in continuous_cols:
-        if col == "geometry" or col in ignore_cols:
-            continue
-        mean, std = scaled_features.get(col, [df[col].mean(), df[col].std()])
-        scaled_features[col] = [mean, std]
-        df.loc[:, col] = (df[col] - mean) / std
-    return df, scaled_features
-
-
-def impute_missing_values(df: pd.DataFrame) -> pd.DataFrame:
-    imputer = KNNImputer(n_neighbors=3)
-    df.loc[:, :] = imputer.fit_transform(df)
-    return df
+    scaler: Optional[ContinuousScaler] = None,
+) -> Tuple[pd.DataFrame, ContinuousScaler]:
+    """Scale continuous columns of `df`, fitting a new scaler unless one is given"""
+    if scaler is None:
+        scaler = ContinuousScaler(n_sample, ignore_cols).fit(df)
+    return scaler.transform(df), scaler
+
+
+class MissingValueImputer:
+    """Fill missing values from donor rows of the frame the imputer was fitted on.
+
+    `method="knn"` averages the `n_neighbors` nearest donors found with a k-d tree
+    over the standardized `neighbor_cols` (default: `location_cols`); one-hot columns
+    are left unscaled and rows are queried in chunks of `chunk_size`. Columns that go
+    missing together share one index. A k-d tree only beats a brute-force scan in
+    few dimensions (roughly 20 at most), so keep `neighbor_cols` to a small set of
+    neighbour-defining columns.
+    `method="geo"` instead finds donors with a haversine BallTree over
+    `location_cols` (latitude, longitude), so it must run before those are dropped;
+    rows without coordinates are no donors and get the medians.
+    `method="median"` fills training medians, which also back any cell the
+    neighbour search cannot fill.
+    """
+
+    def __init__(
+        self,
+        method: str = "knn",
+        n_neighbors: int = 3,
+        neighbor_cols: Optional[List[str]] = None,
+        chunk_size: int = 10000,
+        location_cols: List[str] = ["latitude", "longitude"],
+    ):
+        if method not in ("knn", "geo", "median"):
+            raise ValueError(f"Unknown imputation method {method}")
+        self.method = method
+        self.n_neighbors = n_neighbors
+        self.neighbor_cols = neighbor_cols
+        self.chunk_size = chunk_size
+        self.location_cols = list(location_cols)
+        self.medians = pd.Series(dtype=np.float64)
+        self.space_cols = []
+        self.space_means = np.empty(0)
+        self.space_stds = np.empty(0)
+        self.donor_groups = []
+
+    def fit(self, df: pd.DataFrame) -> "MissingValueImputer":
+        from sklearn.neighbors import NearestNeighbors
+
+        missing = df.isna()
+        self.medians = df.median(numeric_only=True)
+        self.donor_groups = []
+        impute_cols = list(missing.columns[missing.any()])
+        if self.method == "median" or not impute_cols:
+            return self
 
+        neighbor_cols = self.neighbor_cols
+        if self.method == "geo" or neighbor_cols is None:
+            neighbor_cols = self.location_cols
+        missing_cols = [c for c in neighbor_cols if c not in df]
+        if missing_cols:
+            raise ValueError(f"Neighbour columns {missing_cols} are not in the frame")
+        self.space_cols = list(neighbor_cols)
+        if self.method == "knn":
+            space = df[self.space_cols].to_numpy(dtype=np.float64)
+            self.space_means = np.nanmean(space, axis=0)
+            self.space_stds = np.nanstd(space, axis=0)
+            # one-hot indicators keep their 0/1 scale, otherwise rare ones dominate
+            is_binary = ((space == 0) | (space == 1) | np.isnan(space)).all(axis=0)
+            self.space_means[is_binary] = 0.0
+            self.space_stds[is_binary | ~(self.space_stds > 0)] = 1.0
+        space = self._neighbor_space(df)
+        located = ~np.isnan(space).any(axis=1)
 
-def segment_df(df_X: pd.DataFrame, df_y: pd.Series, column_prefix: str) -> Dict:
-    column_selectors = [c for c in df_X.columns if c.startswith(column_prefix)]
-    dfs = {}
-    for col in column_selectors:
-        data_key = col.replace(column_prefix, "")
-        df_X_seg = df_X.loc[df_X[col] == 1]
-        df_y_seg = df_y.loc[df_X_seg.index]
-        df_X_seg.drop(column_selectors, axis=1, inplace=True)
-        dfs[data_key] = [df_X_seg, df_y_seg]
-    return dfs
+        # columns missing on exactly the same rows share donors and one index
+        patterns = {}
+        for col in missing.columns[missing.any()]:
+            patterns.setdefault(missing[col].to_numpy().tobytes(), []).append(col)
+        for cols in patterns.values():
+            donors = ~missing[cols[0]].to_numpy() & located
+            dims = np.array([c not in cols for c in self.space_cols])
+            if donors.sum() < self.n_neighbors or not dims.any():
+                continue
+            if self.method == "geo" and not dims.all():
+                continue  # the coordinates themselves are missing
+            if self.method == "geo":
+                index = NearestNeighbors(
+                    n_neighbors=self.n_neighbors,
+                    algorithm="ball_tree",
+                    metric="haversine",
+                )
+            else:
+                index = NearestNeighbors(
+                    n_neighbors=self.n_neighbors, algorithm="kd_tree"
+                )
+            index.fit(space[np.ix_(donors, dims)])
+            donor_values = df.loc[donors, cols].to_numpy(dtype=np.float64)
+            self.donor_groups.append((cols, dims, index, donor_values))
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.donor_groups:
+            space = self._neighbor_space(df)
+            # rows without coordinates (geo) are left to the medians
+            located = ~np.isnan(space).any(axis=1)
+            for cols, dims, index, donor_values in self.donor_groups:
+                values = df[cols].to_numpy(dtype=np.float64, copy=True)
+                rows = np.flatnonzero(np.isnan(values).any(axis=1) & located)
+                for start in range(0, len(rows), self.chunk_size):
+                    chunk = rows[start : start + self.chunk_size]
+                    __, nbrs = index.kneighbors(space[np.ix_(chunk, dims)])
+                    fill = donor_values[nbrs].mean(axis=1)
+                    values[chunk] = np.where(
+                        np.isnan(values[chunk]), fill, values[chunk]
+                    )
+                df[cols] = values
+        missing_cols = [c for c in self.medians.index if c in df and df[c].isna().any()]
+        if missing_cols:
+            df[missing_cols] = df[missing_cols].fillna(self.medians[missing_cols])
+        return df
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def _neighbor_space(self, df: pd.DataFrame) -> np.ndarray:
+        """Standardized neighbour-defining columns, with missing values at the mean"""
+        space = df[self.space_cols].to_numpy(dtype=np.float64, copy=True)
+        if self.method == "geo":
+            return np.radians(space)
+        space -= self.space_means
+        space /= self.space_stds
+        space[np.isnan(space)] = 0.0
+        return space
+
+
+def impute_missing_values(
+    df: pd.DataFrame,
+    method: str = "knn",
+    imputer: Optional[MissingValueImputer] = None,
+    location_cols: List[str] = ["latitude", "longitude"],
+) -> Tuple[pd.DataFrame, MissingValueImputer]:
+    """Impute missing values of `df`, fitting a new imputer unless one is given"""
+    if imputer is None:
+        imputer = MissingValueImputer(method=method, location_cols=location_cols)
+        imputer.fit(df)
+    return imputer.transform(df), imputer
+
+
+def segment_indices(
+    df_X: pd.DataFrame, column_prefix: str, min_rows: int = 0
+) -> Dict[str, np.ndarray]:
+    """Positional row indices of every segment of the one-hot block `column_prefix*`.
+    The block is decoded into one integer code per row with a single argmax and
+    grouped with one stable sort; rows with no active column belong to no segment.
+    Segments with fewer than `min_rows` rows are left out before any data is copied.
+    """
+    if isinstance(df_X, CompactFrame) and column_prefix in df_X.groups:
+        column_selectors, codes = df_X.groups[column_prefix]
+    else:
+        column_selectors = [c for c in df_X.columns if c.startswith(column_prefix)]
+        onehot = df_X[column_selectors].to_numpy()
+        codes = onehot.argmax(axis=1)
+        codes[onehot.max(axis=1) != 1] = -1
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(column_selectors) + 1))
+    return {
+        col.replace(column_prefix, ""): order[start:end]
+        for col, start, end in zip(column_selectors, bounds[:-1], bounds[1:])
+        if end - start >= min_rows
+    }
+
+
+def take_segment(
+    df_X: pd.DataFrame, df_y: pd.Series, rows: np.ndarray, column_prefix: str
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """Copy out one segment's rows, without its one-hot `column_prefix*` columns"""
+    if isinstance(df_X, CompactFrame):
+        drop_cols = [c for c in df_X.columns if c.startswith(column_prefix)]
+        return df_X.take(rows).drop(drop_cols, axis=1), df_y.iloc[rows]
+    keep_cols = [
+        i for i, c in enumerate(df_X.columns) if not c.startswith(column_prefix)
+    ]
+    return df_X.iloc[rows, keep_cols], df_y.iloc[rows]
+
+
+def segment_df(
+    df_X: pd.DataFrame, df_y: pd.Series, column_prefix: str, min_rows: int = 0
+) -> Dict:
+    segments = segment_indices(df_X, column_prefix, min_rows)
+    return {
+        data_key: list(take_segment(df_X, df_y, rows, column_prefix))
+        for data_key, rows in segments.items()
+    }
+
+
+def _digest(values) -> str:
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest()
+
+
+def binary_mutual_info(X: np.ndarray, y: np.ndarray, n_bins: int = 20) -> np.ndarray:
+    """Closed-form mutual information (nats) between each 0/1 column of `X` and `y`
+    binned into `n_bins` quantiles"""
+    edges = np.unique(np.quantile(y, np.linspace(0, 1, n_bins + 1)[1:-1]))
+    y_onehot = np.eye(len(edges) + 1)[np.searchsorted(edges, y, side="right")]
+    n = float(len(y))
+    p_y = y_onehot.sum(axis=0) / n
+    p_x1y = (X.T.astype(np.float64) @ y_onehot) / n
+    p_x0y = p_y - p_x1y
+    p_x1 = p_x1y.sum(axis=1, keepdims=True)
+    mi = np.zeros(X.shape[1])
+    for p_xy, p_x in ((p_x1y, p_x1), (p_x0y, 1 - p_x1)):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = p_xy * np.log(p_xy / (p_x * p_y))
+        mi += np.nansum(terms, axis=1)
+    return np.maximum(mi, 0.0)
+
+
+_mi_target = None
+
+
+def _init_mi_worker(y: np.ndarray, random_state: int) -> None:
+    global _mi_target
+    _mi_target = (y, random_state)
+
+
+def _knn_mutual_info(x: np.ndarray) -> float:
+    y, random_state = _mi_target
+    return mutual_info_regression(x.reshape(-1, 1), y, random_state=random_state)[0]
+
+
+def mutual_info_scores(
+    X: pd.DataFrame,
+    y: pd.Series,
+    random_state: int = 123,
+    n_workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    binary_fast_path: bool = True,
+) -> pd.Series:
+    """Mutual information of every column of `X` with `y`. Continuous columns use the
+    k-NN estimate of `mutual_info_regression`, one column per task on a process pool;
+    0/1 columns use `binary_mutual_info` unless `binary_fast_path` is off. Scores are
+    cached in `cache_dir` under the hash of each column's values, `y` and the seed.
+    """
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+
+    y_values = np.asarray(y, dtype=np.float64)
+    cache, cache_path = {}, None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        fast = "binary" if binary_fast_path else "knn"
+        name = f"mi_{_digest(y_values)}_{random_state}_{fast}.json"
+        cache_path = os.path.join(cache_dir, name)
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                cache = json.load(f)
+
+    scores, todo = {}, []
+    for col in X.columns:
+        key = f"{col}:{_digest(X[col].to_numpy())}"
+        if key in cache:
+            scores[col] = cache[key]
+        else:
+            todo.append((col, key))
+    print(f"Mutual information: {len(scores)} cached, {len(todo)} to score")
+
+    values = X[[col for col, __ in todo]].to_numpy(dtype=np.float64)
+    is_binary = ((values == 0) | (values == 1)).all(axis=0)
+    if not binary_fast_path:
+        is_binary[:] = False
+    new_scores = np.empty(len(todo))
+    if is_binary.any():
+        new_scores[is_binary] = binary_mutual_info(values[:, is_binary], y_values)
+    knn_cols = np.flatnonzero(~is_binary)
+    n_cores = os.cpu_count() or 1
+    n_workers = min(n_workers or n_cores, n_cores, max(len(knn_cols), 1))
+    if n_workers == 1:
+        _init_mi_worker(y_values, random_state)
+        new_scores[knn_cols] = [_knn_mutual_info(values[:, i]) for i in knn_cols]
+    elif len(knn_cols):
+        with ProcessPoolExecutor(
+            n_workers, initializer=_init_mi_worker, initargs=(y_values, random_state)
+        ) as pool:
+            columns = (values[:, i] for i in knn_cols)
+            new_scores[knn_cols] = list(
+                pool.map(_knn_mutual_info, columns, chunksize=4)
+            )
+
+    for (col, key), score in zip(todo, new_scores):
+        scores[col] = cache[key] = float(score)
+    if cache_path and todo:
+        with atomic_path(cache_path) as tmp_path, open(tmp_path, "w") as f:
+            json.dump(cache, f)
+    return pd.Series(scores)[X.columns]
 
 
 def feature_selection(
-    dfs: List[pd.DataFrame], y: pd.Series, model_dim: int
+    dfs: List[pd.DataFrame],
+    y: pd.Series,
+    model_dim: int,
+    cache_dir: Optional[str] = None,
 ) -> Tuple[Tuple[pd.DataFrame], Tuple[str]]:
     """Select best features using first df in `dfs` and `y` as training, and return
-    transformed features from all dfs
+    the selected columns of all dfs (see `select_columns`)
     """
-    feature_selector = SelectKBest(mutual_info_regression, k=model_dim)
-    feature_selector.fit(dfs[0], y)
-    feature_names = feature_selector.get_feature_names_out(dfs[0].columns)
-    transformed_dfs = [
-        pd.DataFrame(feature_selector.transform(df), columns=feature_names)
-        for df in dfs
-    ]
-    return tuple(transformed_dfs), feature_names
+    X = dfs[0].to_frame() if isinstance(dfs[0], CompactFrame) else dfs[0]
+    scores = mutual_info_scores(X, y, cache_dir=cache_dir)
+    # same pick (and tie-breaking) as SelectKBest
+    mask = np.zeros(len(scores), dtype=bool)
+    mask[np.argsort(scores.to_numpy(), kind="mergesort")[-model_dim:]] = True
+    feature_names = X.columns[mask].to_numpy(dtype=object)
+    return tuple(select_columns(df, feature_names) for df in dfs), feature_names
+
 
+def select_columns(df: pd.DataFrame, columns, dtype=np.float32) -> pd.DataFrame:
+    """Return `columns` of `df`, keeping its index, as a frame over one contiguous
+    `dtype` block. The block is filled column by column, and estimators read it back
+    through `np.asarray` without another copy. A `CompactFrame` only expands the
+    selected one-hot columns"""
+    block = np.empty((len(columns), len(df)), dtype=dtype)
+    for i, col in enumerate(columns):
+        block[i] = df[col].to_numpy()
+    return pd.DataFrame(block.T, index=df.index, columns=columns, copy=False)
+
+
+_sweep_data = None
+
+
+def _init_sweep_worker(X_train, y_train, X_val, y_val) -> None:
+    global _sweep_data
+    _sweep_data = (X_train, y_train, X_val, y_val)
+
+
+def _fit_candidate(
+    max_depth: int, n_jobs: int, random_state: int
+) -> Tuple[RandomForestRegressor, float, float]:
+    """Fit and validate one depth candidate on the data held by this worker"""
+    X_train, y_train, X_val, y_val = _sweep_data
+    start = time.perf_counter()
+    model = RandomForestRegressor(
+        random_state=random_state, max_depth=max_depth, n_jobs=n_jobs
+    )
+    model.fit(X_train, y_train)
+    y_hat = model.predict(X_val)
+    val_mse = np.mean((y_val - y_hat) ** 2)
+    return model, val_mse, time.perf_counter() - start
+
+
+def _score_candidate(
+    max_depth: int, n_jobs: int, random_state: int
+) -> Tuple[float, float]:
+    """Validation loss and wall time of one candidate; the model stays in the worker"""
+    __, val_mse, wall = _fit_candidate(max_depth, n_jobs, random_state)
+    return val_mse, wall
+
+
+def halving_search(
+    X_train,
+    y_train,
+    X_val,
+    y_val,
+    maxdepths: List[int],
+    n_estimators: int = 100,
+    eta: int = 2,
+    random_state: int = 123,
+    n_jobs: Optional[int] = None,
+) -> RandomForestRegressor:
+    """Successive halving over depth candidates. Every rung grows the surviving
+    forests with `warm_start` up to the rung's tree budget, scores them on the
+    validation set and keeps the best 1/`eta`; the last rung reaches `n_estimators`.
+    Pruned forests are released at the end of their rung, and in the last rung only
+    the best forest so far is kept, so that is the only one returned"""
+    X_val_ = np.asarray(X_val, dtype=np.float32)
+    y_val_ = np.asarray(y_val)
+    n_rungs = int(np.ceil(np.log(len(maxdepths)) / np.log(eta)))
+    budgets = [max(1, n_estimators // eta**r) for r in range(n_rungs, -1, -1)]
+    survivors = {
+        md: RandomForestRegressor(
+            random_state=random_state, max_depth=md, warm_start=True, n_jobs=n_jobs
+        )
+        for md in maxdepths
+    }
+    best_depth, best_model = None, None
+    for rung, n_trees in enumerate(budgets):
+        final = rung == len(budgets) - 1
+        losses, limits = {}, {}
+        for md in list(survivors):
+            model = survivors.pop(md) if final else survivors[md]
+            start = time.perf_counter()
+            model.set_params(n_estimators=n_trees)
+            model.fit(X_train, y_train)
+            tree_preds = np.stack([t.predict(X_val_) for t in model.estimators_])
+            losses[md] = np.mean((y_val_ - tree_preds.mean(axis=0)) ** 2)
+            # small forests flatter shallow trees: rank on the loss expected once the
+            # between-tree variance has averaged out, MSE_n - var / n
+            limits[md] = losses[md] - tree_preds.var(axis=0, ddof=1).mean() / n_trees
+            print(
+                f"TRAINING RESULT: val_loss={losses[md]} (max_depth={md}, "
+                f"n_estimators={n_trees}, wall_time={time.perf_counter() - start:.1f}s)"
+            )
+            if final and (best_depth is None or losses[md] < losses[best_depth]):
+                best_depth, best_model = md, model
+            del model, tree_preds
+        if not final:
+            keep = sorted(limits, key=limits.get)[: int(np.ceil(len(limits) / eta))]
+            survivors = {md: survivors[md] for md in maxdepths if md in keep}
+    print(
+        f"BEST TRAINING RESULT: val_loss={losses[best_depth]} (max_depth={best_depth})"
+    )
+    return best_model
+
+
+def train(
+    X_train,
+    y_train,
+    X_val,
+    y_val,
+    n_workers: Optional[int] = None,
+    random_state: int = 123,
+    search: str = "grid",
+) -> RandomForestRegressor:
+    """Train simple RandomForest model. With `search="grid"` depth candidates are
+    fitted concurrently on a pool of `n_workers` processes (default: one per
+    candidate, capped by the core count), and the remaining cores are split between
+    each candidate's trees. `search="halving"` runs `halving_search` instead"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    maxdepths = [int(md) for md in np.linspace(2, 20, 10)]
+    n_cores = os.cpu_count() or 1
+    if search == "halving":
+        return halving_search(
+            X_train,
+            y_train,
+            X_val,
+            y_val,
+            maxdepths,
+            random_state=random_state,
+            n_jobs=n_cores,
+        )
+    elif search != "grid":
+        raise ValueError(f"Unknown search mode {search}")
+    n_workers = min(n_workers or n_cores, len(maxdepths), n_cores)
+    tree_jobs = max(1, n_cores // n_workers)
+    data = (X_train, y_train, X_val, y_val)
+
+    if n_workers == 1:
+        _init_sweep_worker(*data)
+        results = (_fit_candidate(md, tree_jobs, random_state) for md in maxdepths)
+    else:
+        print(
+            f"Sweeping {len(maxdepths)} depths on {n_workers} workers"
+            f" x {tree_jobs} jobs"
+        )
+        with ProcessPoolExecutor(
+            n_workers, initializer=_init_sweep_worker, initargs=data
+        ) as pool:
+            futures = [
+                pool.submit(_score_candidate, md, tree_jobs, random_state)
+                for md in maxdepths
+            ]
+            results = [(None, *f.result()) for f in futures]
 
-def train(X_train, y_train, X_val, y_val) -> RandomForestRegressor:
-    """Train simple RandomForest model"""
-    maxdepths = np.linspace(2, 20, 10)
     best_val = 1e6
     best_depth = -1
     best_model = None
-    for md in maxdepths:
-        model = RandomForestRegressor(random_state=123, max_depth=md)
-        model.fit(X_train, y_train)
-        y_hat = model.predict(X_val)
-        val_mse = np.mean((y_val - y_hat) ** 2)
-        print(f"TRAINING RESULT: val_loss={val_mse} (max_depth={md})")
+    for md, (model, val_mse, wall) in zip(maxdepths, results):
+        print(
+            f"TRAINING RESULT: val_loss={val_mse}"
+            f" (max_depth={md}, wall_time={wall:.1f}s)"
+        )
         if val_mse < best_val:
             best_val = val_mse
             best_depth = md
             best_model = model
     print(f"BEST TRAINING RESULT: val_loss={best_val} (max_depth={best_depth})")
+    if best_model is None:
+        # refit the winner rather than shipping every forest back from the pool
+        best_model = RandomForestRegressor(
+            random_state=random_state, max_depth=best_depth, n_jobs=n_cores
+        )
+        best_model.fit(X_train, y_train)
     return best_model
 
 
@@ -106,35 +838,40 @@ def load_dataset(
     index_col: str = "strap",
     location_cols: Tuple[str] = ["longitude", "latitude"],
     debug: bool = False,
-) -> Tuple[Tuple[pd.DataFrame], Dict]:
-    """Load base sales price prediction dataset"""
+    columnar_cache: bool = False,
+    compact: bool = False,
+) -> Tuple[Tuple[pd.DataFrame], ContinuousScaler]:
+    """Load base sales price prediction dataset. With `columnar_cache`, a local CSV is
+    parsed once into a typed Arrow file that later runs memory-map instead. With
+    `compact`, the feature splits are `CompactFrame`s"""
     # load file
     print(f"Loading benchmark data from {file_path}...")
-    df = pd.read_csv(file_path)
+    if columnar_cache and os.path.isfile(file_path):
+        df = read_benchmark_data(
+            file_path, index_col, split_col, location_cols=location_cols
+        )
+    else:
+        df = pd.read_csv(file_path)
     df[index_col] = df[index_col].astype(str)
     df = df.set_index(index_col)
     if debug:
         df = df.head(5000)
     print(f"Loaded {df.shape[0]} lines")
+    if compact:
+        df = CompactFrame.from_frame(df, location_cols=location_cols)
 
     # split
-    X_train = df.loc[df[split_col] == "TRAIN"]
+    X_train = df.take(np.flatnonzero(df[split_col] == "TRAIN"))
     X_train.drop([split_col], axis=1, inplace=True)
-    X_val = df.loc[df[split_col] == "VALIDATE"]
+    X_val = df.take(np.flatnonzero(df[split_col] == "VALIDATE"))
     X_val.drop([split_col], axis=1, inplace=True)
-    X_test = df.loc[df[split_col] == "TEST"]
+    X_test = df.take(np.flatnonzero(df[split_col] == "TEST"))
     X_test.drop([split_col], axis=1, inplace=True)
 
     # scale continuous features
-    X_train, scaled_features = scale_continuous_values(
-        X_train, ignore_cols=location_cols
-    )
-    X_val, scaled_features = scale_continuous_values(
-        X_val, ignore_cols=location_cols, scaled_features=scaled_features
-    )
-    X_test, scaled_features = scale_continuous_values(
-        X_test, ignore_cols=location_cols, scaled_features=scaled_features
-    )
+    X_train, scaler = scale_continuous_values(X_train, ignore_cols=location_cols)
+    X_val, __ = scale_continuous_values(X_val, scaler=scaler)
+    X_test, __ = scale_continuous_values(X_test, scaler=scaler)
 
     # separate x/y
     y_train = X_train[label_col]
@@ -151,4 +888,4 @@ def load_dataset(
         y_val,
         X_test,
         y_test,
-    ), scaled_features
+    ), scaler